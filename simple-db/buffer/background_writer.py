@@ -0,0 +1,158 @@
+import math
+import threading
+
+
+class BackgroundWriter:
+    """
+    Writes dirty, unpinned buffers from a background thread, so that a pin
+    rarely has to write its victim before reusing it, and a commit finds
+    most of its buffers written already.
+
+    Every `interval` milliseconds, or as soon as a pin had to evict a dirty
+    buffer, the writer counts the unpinned buffers that are clean. While fewer
+    than `clean_target` of the pool are, it writes the dirty unpinned buffers
+    modified longest ago, in batches of up to BATCH buffers in block order.
+    Writing the oldest changes first also keeps the amount of work left for
+    commits and for the checkpoint at recovery small.
+
+    The log is flushed up to the buffers' LSNs before they are written, as the
+    write-ahead rule requires, and their files are synced as the log's
+    durability policy dictates. Only choosing a batch and marking it clean
+    happen under the pool latch: the writer copies the pages under it and
+    writes the copies without it, so pins are not held up by its I/O.
+    While a copy is being written and synced, the buffer's `written` event is
+    cleared; a pin that evicts the buffer, or a commit that writes it, waits
+    for it so that its own write lands last. A buffer modified while its copy
+    was written stays dirty, and so does every buffer of a batch whose write
+    or sync failed, so that the waiter writes it again and sees the error.
+    """
+    CLEAN_TARGET = 0.25  # share of the pool kept clean and unpinned
+    INTERVAL = 100  # milliseconds between passes
+    BATCH = 32  # buffers written per batch
+
+    def __init__(self, buffer_manager, log_manager, clean_target=CLEAN_TARGET, interval=INTERVAL):
+        """
+        Starts the writer thread of a buffer manager.
+
+        :param buffer_manager: the BufferManager whose buffers are written
+        :param log_manager: the LogManager flushed before each batch
+        :param clean_target: share of the pool to keep clean, between 0 and 1
+        :param interval: milliseconds between passes when nobody wakes the writer
+        """
+        self.buffer_manager = buffer_manager
+        self.log_manager = log_manager
+        self.clean_target = clean_target
+        self.interval = interval
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.copies = [buffer_manager.file_manager.new_page() for _ in range(self.BATCH)]  # pages a batch is written from
+
+        self.passes = 0
+        self.batches = 0
+        self.written = 0
+        self.errors = 0
+
+        self.thread = threading.Thread(target=self._run, name="buffer-writer", daemon=True)
+        self.thread.start()
+
+    def evicting_dirty(self):
+        """
+        Wakes the writer up: a pin is about to write a dirty victim itself.
+        """
+        self.wakeup.set()
+
+    def write_batch(self):
+        """
+        Writes one batch of dirty, unpinned buffers if the pool is short of clean ones.
+
+        :return: the number of buffers written
+        """
+        bm = self.buffer_manager
+        lsn = self._choose()[1]  # a first guess without the latch, only to flush the log ahead
+        if lsn is None:
+            return 0
+        self.log_manager.flush(lsn)  # the log wait happens before any buffer is reserved
+
+        with bm.lock:
+            batch, lsn = self._choose()
+            if not batch:
+                return 0
+            batch.sort(key=lambda buffer: (buffer.block().file_name(), buffer.block().number()))
+            blocks = [buffer.block() for buffer in batch]
+            copies = self.copies[:len(batch)]
+            for buffer, copy in zip(batch, copies):
+                copy.contents()[:] = buffer.contents().contents()
+                buffer.written.clear()
+            modifications = [buffer.modifications for buffer in batch]
+
+        try:
+            self.log_manager.flush(lsn)  # returns at once unless a buffer was modified meanwhile
+            bm.file_manager.write_blocks(blocks, copies)
+            self.log_manager.sync_data({block.filename() for block in blocks})
+        finally:
+            for buffer in batch:
+                buffer.written.set()  # on failure the buffers stay dirty, and whoever waits writes them itself
+
+        with bm.lock:
+            for buffer, block, count in zip(batch, blocks, modifications):
+                if buffer.block() == block and buffer.modifications == count and buffer.modifying_tx() >= 0:
+                    buffer.mark_clean()
+        self.batches += 1
+        self.written += len(batch)
+        return len(batch)
+
+    def stats(self):
+        """
+        Returns the writer's counters.
+
+        :return: dict of counter name to value
+        """
+        return {
+            "passes": self.passes,
+            "batches": self.batches,
+            "written": self.written,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        """
+        Stops the writer thread after its current batch.
+        """
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join()
+
+    def _choose(self):
+        """
+        Chooses the buffers of the next batch: the dirty, unpinned buffers
+        modified longest ago, as many as the pool lacks clean ones, up to BATCH.
+        The dirty buffers are found in the pool's DirtyPageTable, so a pass
+        does not scan the pool. Only a batch chosen under the pool latch is exact.
+
+        :return: the buffers and the highest LSN among them, or ([], None)
+        """
+        bm = self.buffer_manager
+        dirty = [buffer for buffer in bm.dirty_pages.buffers() if not buffer.is_pinned()]
+        clean = bm.num_available - len(dirty)
+        target = math.ceil(self.clean_target * len(bm.buffer_pool))  # a shard of a sharded pool changes size
+        wanted = min(target - clean, self.BATCH)
+        if wanted <= 0 or not dirty:
+            return [], None
+        dirty.sort(key=lambda buffer: buffer.lsn)
+        batch = dirty[:wanted]
+        return batch, max(buffer.lsn for buffer in batch)
+
+    def _run(self):
+        """
+        The writer thread: writes batches until the clean target is met,
+        then sleeps until the next pass.
+        """
+        while not self.stopped:
+            self.wakeup.wait(self.interval / 1000)
+            self.wakeup.clear()
+            self.passes += 1
+            try:
+                while not self.stopped and self.write_batch():
+                    pass
+            except Exception:
+                self.errors += 1  # the buffers stay dirty; the pin or commit that writes them reports the error
@@ -1,21 +1,34 @@
-from file.page import Page
+import threading
+
+
 class Buffer:
-    def __init__(self, file_manager, log_manager):
+    def __init__(self, file_manager, log_manager, dirty_pages=None):
         """
         Initializes the Buffer.
 
         :param file_manager: Instance of FileManager for file operations.
         :param log_manager: Instance of LogManager for logging operations.
+        :param dirty_pages: DirtyPageTable of the pool, told whenever the buffer becomes dirty or clean.
         """
         
-        self.file_manager = file_manager
-        self.log_manager = log_manager
+        self.fm = file_manager
+        self.lm = log_manager
+        self.dirty_pages = dirty_pages
         
-        self.contents = Page(file_manager.block_size)
-        self.block = None
+        self._contents = file_manager.new_page()
+        self.blk = None
         self.pins = 0
         self.txnum = -1
         self.lsn = -1
+        self.prefetched = False  # filled by read-ahead and not pinned since
+        self.ready = threading.Event()  # cleared while a read-ahead is filling the page
+        self.ready.set()
+        self.read_error = None  # the exception of a read-ahead that failed to fill the page
+        self.written = threading.Event()  # cleared while the background writer writes a copy of the page
+        self.written.set()
+        self.modifications = 0  # set_modified calls, so a background write can tell if the page changed since its copy
+        self.reads = 0  # blocks read into the buffer
+        self.writes = 0  # dirty contents written back by flush
         
     def contents(self):
         """
@@ -23,7 +36,7 @@ class Buffer:
 
         :return: Page object containing buffer data.
         """
-        return self.contents
+        return self._contents
     
     def block(self):
         """
@@ -31,7 +44,7 @@ class Buffer:
 
         :return: BlockId or None if not assigned.
         """
-        return self.block
+        return self.blk
     
     def set_modified(self, txnum, lsn):
         """
@@ -41,6 +54,9 @@ class Buffer:
         :param lsn: Log Sequence Number.
         """
         
+        if self.dirty_pages is not None:
+            self.dirty_pages.modified(self, self.txnum, txnum)
+        self.modifications += 1
         self.txnum = txnum
         if lsn > 0:
             self.lsn = lsn
@@ -61,27 +77,45 @@ class Buffer:
         """
         return self.txnum
     
-    def assign_to_block(self, block):
+    def assign_to_block(self, block, read=True):
         """
         Reads the contents of the specified block into the buffer.
         If the buffer was modified, it first flushes its contents.
 
         :param block: BlockId object to be assigned.
+        :param read: False if the caller fills the page itself, as read-ahead does.
         """
         self.flush()
         self.blk = block
-        self.fm.read(self.blk, self.contents)
+        if read:
+            self.fm.read_block(self.blk, self._contents)
+            self.reads += 1
         self.pins = 0
+        self.prefetched = False
+        self.read_error = None
         
     def flush(self):
         """
         Writes the buffer to disk if it has been modified.
         Ensures all log records up to `lsn` are written before flushing.
+        A background write of an older copy of the page is waited for,
+        so that it cannot land after this one.
         """
         if self.txnum >= 0:
+            self.written.wait()
             self.lm.flush(self.lsn)
-            self.fm.write(self.blk, self.contents)
-            self.txnum = -1  # Reset transaction ID after writing
+            self.fm.write(self.blk, self._contents)
+            self.writes += 1
+            self.mark_clean()
+            
+    def mark_clean(self):
+        """
+        Records that the buffer's contents have been written to disk
+        by someone else, e.g. a batched flush in the buffer manager.
+        """
+        if self.dirty_pages is not None:
+            self.dirty_pages.cleaned(self, self.txnum)
+        self.txnum = -1  # Reset transaction ID after writing
             
     def pin(self):
         """
@@ -1,22 +1,85 @@
 
+from collections import OrderedDict, deque
+from .background_writer import BackgroundWriter
 from .buffer import Buffer
+from .dirty_page_table import DirtyPageTable
+from file.latency_histogram import LatencyHistogram
+from .read_ahead import ReadAheadEngine
+from .replacement import ReplacementPolicy
+import threading
 import time
 
 class BufferManager:
     """Manages the pinning and unpinning of buffers to blocks.
+    
+    A hash table maps each assigned block to its buffer, so that finding
+    a block's buffer takes constant time whatever the size of the pool.
+    Which unpinned buffer is reused for a new block is decided by a
+    ReplacementPolicy (see buffer/replacement.py).
+    
+    A pin that finds no unpinned buffer waits on a condition that unpin
+    signals. Waiters are served in arrival order: while any thread waits,
+    a newcomer may only take a buffer for a block that is already in the pool.
+    
+    Optionally, a BackgroundWriter keeps a share of the unpinned buffers
+    clean, so that pins seldom write a victim themselves.
+    
+    Counters and latency histograms are updated under the pool latch that
+    is held anyway, so they cost a few integer operations per pin; `stats`
+    reports them.
     """
     
     MAX_TIME = 10000  # 10 seconds
+    REPLACEMENT = "lru"
     
-    def __init__(self, num_buffers, file_manager, log_manager):
+    def __init__(self, num_buffers, file_manager, log_manager,
+                 read_ahead_window=0, read_ahead_workers=ReadAheadEngine.WORKERS, replacement=REPLACEMENT,
+                 max_wait=MAX_TIME, clean_target=0, writer_interval=BackgroundWriter.INTERVAL):
         """
         Creates a buffer manager having the specified number of buffer slots.
         :param num_buffers: Number of buffer slots to allocate.
         :param file_manager: Instance of FileManager for file operations.
         :param log_manager: Instance of LogManager for logging operations.
+        :param read_ahead_window: Number of blocks read ahead of a sequential scan, 0 to disable read-ahead.
+        :param read_ahead_workers: Number of threads issuing read-ahead I/O.
+        :param replacement: Name of the replacement policy: "lru", "clock", "lru2" or "2q".
+        :param max_wait: Milliseconds a pin waits for a free buffer before raising BufferAbortException.
+        :param clean_target: Share of the pool the background writer keeps clean, 0 to disable the writer.
+        :param writer_interval: Milliseconds between the background writer's passes.
         """
+        self.file_manager = file_manager
+        self.log_manager = log_manager
         self.num_available = num_buffers
-        self.buffer_pool = [Buffer(file_manager, log_manager) for _ in range(num_buffers)]
+        self.dirty_pages = DirtyPageTable()
+        self.buffer_pool = [Buffer(file_manager, log_manager, self.dirty_pages) for _ in range(num_buffers)]
+        self.buffer_table = {}  # BlockId -> Buffer assigned to it
+        self.replacement = ReplacementPolicy.create(replacement, self.buffer_pool)
+        self.free_prefetched = OrderedDict()  # unpinned buffers filled by read-ahead and not pinned since
+        self.trace = None  # list of the blocks pinned, while recording a trace (see trace_replay.py)
+        self.lock = threading.RLock()  # guards the pool; read-ahead threads share it
+        self.buffer_freed = threading.Condition(self.lock)  # signalled when a buffer's pin count drops to zero
+        self.waiters = deque()  # tickets of the threads waiting for a free buffer, oldest first
+        self.max_wait = max_wait
+        self.balancer = None  # the ShardedBufferManager lending buffers between shards, if this is a shard
+        
+        self.hits = 0  # pins that found their block in the pool
+        self.misses = 0
+        self.evictions = 0  # blocks replaced by a miss
+        self.dirty_evictions = 0  # evictions that wrote the victim first
+        self.waits = 0  # pins that had to wait for a free buffer
+        self.timeouts = 0
+        self.max_pinned = 0  # high-water mark of the pinned buffers
+        self.committed_writes = 0  # buffers written by flush_all
+        self.ring_reuses = 0  # misses served by a buffer ring's own buffer
+        self.miss_latency = LatencyHistogram()  # time to evict and read on a miss
+        self.wait_latency = LatencyHistogram()
+        self.flush_latency = LatencyHistogram()  # time to write a transaction's buffers
+        self.read_ahead = None
+        if read_ahead_window > 0:
+            self.read_ahead = ReadAheadEngine(self, file_manager, read_ahead_window, read_ahead_workers)
+        self.writer = None
+        if clean_target > 0:
+            self.writer = BackgroundWriter(self, log_manager, clean_target, writer_interval)
        
     def available(self):
         """
@@ -27,12 +90,60 @@ class BufferManager:
       
     def flush_all(self, txnum):
         """
-        Flushes the dirty buffers modified by the specified transaction.
+        Flushes the dirty buffers modified by the specified transaction
+        and syncs their files as the log's durability policy dictates.
+        Only the writes happen under the pool latch; the log flush before them
+        and the sync after them do not hold up other threads' pins.
         :param txnum: the transaction's id number
         """
-        for buffer in self.buffer_pool:
-            if buffer.modifying_tx() == txnum:
-                buffer.flush()
+        filenames = self.write_modified(txnum)
+        if filenames:
+            self.log_manager.sync_data(filenames)
+                
+    def write_modified(self, txnum):
+        """
+        Writes the dirty buffers modified by the specified transaction, without syncing.
+        They are looked up in the dirty-page table, so the cost depends on
+        how many buffers the transaction modified, not on the size of the pool.
+        The log is flushed up to the latest LSN of those buffers before the
+        pool latch is taken, then the buffers are written in block order with
+        coalesced multi-block writes.
+        :param txnum: the transaction's id number
+        :return: the set of the files written, which the caller syncs
+        """
+        with self.lock:
+            dirty = self.dirty_pages.buffers_of(txnum)
+            if not dirty:
+                return set()
+            lsn = max(buffer.lsn for buffer in dirty)
+        self.log_manager.flush(lsn)  # concurrent commits share the log write and sync
+        
+        with self.lock:
+            dirty = self.dirty_pages.buffers_of(txnum)  # the background writer may have written some meanwhile
+            if not dirty:
+                return set()
+            
+            began = time.perf_counter()
+            for buffer in dirty:
+                buffer.written.wait()  # an older copy being written by the background writer must land first
+            dirty.sort(key=lambda buffer: (buffer.block().file_name(), buffer.block().number()))
+            self.log_manager.flush(max(buffer.lsn for buffer in dirty))  # returns at once unless modified since
+            self.file_manager.write_blocks([buffer.block() for buffer in dirty],
+                                           [buffer.contents() for buffer in dirty])
+            for buffer in dirty:
+                buffer.mark_clean()
+            self.committed_writes += len(dirty)
+            self.flush_latency.record(time.perf_counter() - began)
+            return {buffer.block().filename() for buffer in dirty}
+                
+    def close(self):
+        """
+        Stops the background threads: the buffer writer and the read-ahead workers.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        if self.read_ahead is not None:
+            self.read_ahead.close()
                 
     def unpin(self, buffer: Buffer):
         """
@@ -40,62 +151,310 @@ class BufferManager:
         If it's pin count goes to zero, then notify any awaiting threads.
         :param buffer: the buffer to be unpinned
         """
-        buffer.unpin()
-        if not buffer.is_pinned():
-            self.num_available += 1
+        with self.lock:
+            buffer.unpin()
+            if not buffer.is_pinned():
+                self.num_available += 1
+                if buffer.prefetched:
+                    self.free_prefetched[buffer] = None
+                else:
+                    self.replacement.unpinned(buffer)
+                if self.waiters:
+                    self.buffer_freed.notify_all()
               
-    def pin(self, block):
+    def pin(self, block, ring=None):
         """
         Pins a buffer to the specified block, potentially waiting 
         until a buffer becomes available.
-        If no buffer becomes available within a fixed time period, 
+        Waiting threads are served first come, first served.
+        If no buffer becomes available within max_wait milliseconds,
         then a BufferAbortException is thrown.
         :param block: the block to which the buffer should be pinned
+        :param ring: a BufferRing confining a scan or bulk operation to a few buffers, or None
         :return: the buffer pinned to the block
         """
         try:
-            timestamp = int(time.time() * 1000)  # converts from seconds to milliseconds
-            buffer = self.try_to_pin(block)
-            
-            while buffer is None and not self.waiting_too_long(timestamp):
-                time.sleep(self.MAX_TIME)
-                buffer = self.try_to_pin(block)
-            
-            if buffer is None:
-                raise BufferAbortException()
+            while True:
+                with self.lock:
+                    buffer = None
+                    if not self.waiters or self.find_existing_buffer(block) is not None:
+                        buffer = self.try_to_pin(block, ring)
+                    if buffer is None:
+                        buffer = self.wait_to_pin(block, ring)
+                
+                buffer.ready.wait()  # a read-ahead may still be filling the page
+                if buffer.read_error is None:
+                    break
+                self.unpin(buffer)  # the read-ahead failed; pin again to read the block, or report the error
+            if self.read_ahead is not None and ring is None:
+                self.read_ahead.accessed(block, buffer)
             return buffer
         except InterruptedError:
             raise BufferAbortException()
         
-    def waiting_too_long(self, start_time):
+    def wait_to_pin(self, block, ring=None):
         """
-        Determines whether a certain amount of time has elapsed.
-        :param start_time: the starting time
-        :return: True if the specified amount of time has elapsed, otherwise False
+        Queues the calling thread behind the threads already waiting and
+        waits until it can pin a buffer to the specified block.
+        Only the oldest waiter may take a free buffer; the others retry
+        only if their block has been read into the pool meanwhile.
+        The caller holds the pool latch.
+        :param block: the block to which the buffer should be pinned
+        :param ring: the BufferRing of the pin, or None
+        :return: the buffer pinned to the block
         """
-        return int(time.time() * 1000) - start_time > self.MAX_TIME
+        began = time.monotonic()
+        deadline = began + self.max_wait / 1000
+        self.waits += 1
+        ticket = object()
+        self.waiters.append(ticket)
+        if self.balancer is not None:
+            self.balancer.waiting.add(self)
+        try:
+            while True:
+                if self.waiters[0] is ticket or self.find_existing_buffer(block) is not None:
+                    buffer = self.try_to_pin(block, ring)
+                    if buffer is not None:
+                        return buffer
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise BufferAbortException()
+                if self.balancer is not None:
+                    remaining = min(remaining, self.balancer.RETRY / 1000)  # another shard may free a buffer
+                self.buffer_freed.wait(remaining)
+        finally:
+            self.wait_latency.record(time.monotonic() - began)
+            self.waiters.remove(ticket)
+            if not self.waiters and self.balancer is not None:
+                self.balancer.waiting.discard(self)
+            if self.waiters and self.num_available > 0:
+                self.buffer_freed.notify_all()  # the next waiter may take what is left
         
-    def try_to_pin(self, block):
+    def try_to_pin(self, block, ring=None):
         """
         Tries to pin a buffer to the specified block.
         If there is already a buffer assigned to the block, 
         then that buffer is used.
-        Otherwise, an unpinned buffer from the pool is chosen.
+        Otherwise, an unpinned buffer from the pool is chosen,
+        or from the ring if one is given.
         Returns None if there are no available buffers.
         :param block: the block to which the buffer should be pinned
+        :param ring: a BufferRing, or None
         :return: the buffer pinned to the block, or None if no buffer is available
         """
         buffer = self.find_existing_buffer(block)
         if buffer is None:
-            buffer = self.choose_unpinned_buffer()
+            if ring is None:
+                buffer = self.choose_unpinned_buffer()
+            else:
+                buffer = self.choose_ring_buffer(ring, block)
+            if buffer is None and self.balancer is not None:
+                buffer = self.balancer.borrow(self)
             if buffer is None:
                 return None
-            buffer.assign_to_block(block)
+            if buffer.prefetched and self.read_ahead is not None:
+                self.read_ahead.evicted(buffer)
+            began = time.perf_counter()
+            if buffer.block() is not None:
+                self.evictions += 1
+            if buffer.modifying_tx() >= 0:
+                self.dirty_evictions += 1
+                if self.writer is not None:
+                    self.writer.evicting_dirty()
+            self.assign(buffer, block)
+            self.misses += 1
+            self.miss_latency.record(time.perf_counter() - began)
+        else:
+            self.hits += 1
             
-        if buffer.is_pinned():
+        if not buffer.is_pinned():
+            self.num_available -= 1
+            self.free_prefetched.pop(buffer, None)
+            pinned = len(self.buffer_pool) - self.num_available
+            if pinned > self.max_pinned:
+                self.max_pinned = pinned
+        buffer.pin()
+        self.replacement.pinned(buffer)
+        if self.trace is not None:
+            self.trace.append(block)
+        return buffer
+    
+    def assign(self, buffer, block, read=True):
+        """
+        Assigns an unpinned buffer to a block, keeping the block table up to date.
+        :param buffer: the buffer to reassign
+        :param block: the block it is assigned to
+        :param read: False if the caller fills the page itself, as read-ahead does
+        """
+        old = buffer.block()
+        if old is not None and self.buffer_table.get(old) is buffer:
+            del self.buffer_table[old]
+        try:
+            buffer.assign_to_block(block, read)
+        except Exception:
+            if old is not None and buffer.block() is old:  # flushing failed; it still holds the old block
+                self.buffer_table[old] = buffer
+            raise
+        self.buffer_table[block] = buffer
+        self.replacement.assigned(buffer, old, block)
+    
+    def prefetch(self, block):
+        """
+        Reads the specified block into an unpinned buffer without pinning it,
+        so that a later pin finds it in the pool.
+        The buffer is reserved under the pool latch, but the read happens
+        outside it; a pin that arrives meanwhile waits for the read to finish.
+        :param block: the block to read ahead
+        :return: True if the block was read, False if it was already
+                 in the pool, no buffer was free or a pin is waiting for one
+        """
+        with self.lock:
+            if self.waiters or self.find_existing_buffer(block) is not None:
+                return False
+            buffer = self.choose_unpinned_buffer(evict_prefetched=False)
+            if buffer is None:
+                return False
+            self.assign(buffer, block, read=False)
+            buffer.prefetched = True
+            buffer.ready.clear()
+            buffer.pin()  # keeps the buffer from being chosen while it is filled
             self.num_available -= 1
-            buffer.pin()
+            self.replacement.reserved(buffer)
+        
+        try:
+            self.file_manager.read_block(block, buffer.contents())
+        except Exception as e:
+            with self.lock:  # forget the block, so that a pin reads it again and reports the error
+                self.buffer_table.pop(block, None)
+                buffer.blk = None
+                buffer.prefetched = False
+                buffer.read_error = e  # pins waiting for the read see it
+            return False
+        finally:
+            buffer.ready.set()
+            self.unpin(buffer)
+        return True
+      
+    def stats(self):
+        """
+        Returns the pool's counters and latency histograms; times are in seconds.
+        :return: dict of counter name to value
+        """
+        stats = self.pool_stats([self])
+        if self.read_ahead is not None:
+            stats["read_ahead"] = self.read_ahead.stats()
+        return stats
+    
+    @staticmethod
+    def pool_stats(managers):
+        """
+        Adds up the counters of buffer managers, e.g. the shards of a pool.
+        The high-water mark of pinned buffers adds up the shards' marks,
+        which bounds the pool's mark from above.
+        :param managers: list of BufferManagers
+        :return: dict of counter name to value
+        """
+        buffers = [buffer for manager in managers for buffer in manager.buffer_pool]
+        hits = sum(manager.hits for manager in managers)
+        misses = sum(manager.misses for manager in managers)
+        stats = {
+            "buffers": len(buffers),
+            "available": sum(manager.num_available for manager in managers),
+            "dirty": sum(manager.dirty_pages.count() for manager in managers),
+            "pins": hits + misses,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "reads": sum(buffer.reads for buffer in buffers),
+            "evictions": sum(manager.evictions for manager in managers),
+            "dirty_evictions": sum(manager.dirty_evictions for manager in managers),
+            "write_backs": sum(buffer.writes for buffer in buffers),
+            "committed_writes": sum(manager.committed_writes for manager in managers),
+            "ring_reuses": sum(manager.ring_reuses for manager in managers),
+            "waits": sum(manager.waits for manager in managers),
+            "timeouts": sum(manager.timeouts for manager in managers),
+            "max_pinned": sum(manager.max_pinned for manager in managers),
+        }
+        for name in ("miss_latency", "wait_latency", "flush_latency"):
+            stats[name] = LatencyHistogram.merged(getattr(manager, name) for manager in managers).snapshot()
+        writers = [manager.writer for manager in managers if manager.writer is not None]
+        if writers:
+            stats["writer"] = {name: sum(writer.stats()[name] for writer in writers) for name in writers[0].stats()}
+        return stats
+    
+    def choose_ring_buffer(self, ring, block):
+        """
+        Chooses the buffer to reassign for a pin through a ring: the ring's
+        next buffer in rotation, if it is unpinned and still holds the block
+        the ring put in it, in this pool.
+        While the ring is filling up, or if its next buffer cannot be reused,
+        an ordinary victim is chosen and takes that place in the ring.
+        In a shard, the ring gets an equal part of its size.
+        :param ring: the BufferRing
+        :param block: the block the chosen buffer will hold
+        :return: the chosen buffer, or None if no buffer can be chosen
+        """
+        buffers = ring.buffers.setdefault(self, [])
+        blocks = ring.blocks.setdefault(self, [])
+        size = ring.size if self.balancer is None else -(-ring.size // len(self.balancer.shards))
+        if len(buffers) < size:
+            buffer = self.choose_unpinned_buffer()
+            if buffer is not None:
+                buffers.append(buffer)
+                blocks.append(block)
+            return buffer
+        
+        i = ring.hands.get(self, 0)
+        ring.hands[self] = (i + 1) % len(buffers)
+        buffer = buffers[i]
+        if (not buffer.is_pinned() and buffer.block() == blocks[i]
+                and self.buffer_table.get(blocks[i]) is buffer):
+            self.ring_reuses += 1
+            blocks[i] = block
             return buffer
+        buffer = self.choose_unpinned_buffer()  # pinned, reassigned to another block, or moved to another shard
+        if buffer is not None:
+            buffers[i] = buffer
+            blocks[i] = block
+        return buffer
+    
+    def give_up_buffer(self):
+        """
+        Removes an unpinned buffer from the pool, so that the balancer of a
+        sharded pool can move it to a shard that has none left.
+        The buffer is written first if it is dirty, and leaves unassigned.
+        The caller holds the pool latch.
+        :return: the buffer, or None if none can be spared
+        """
+        if self.waiters:
+            return None
+        buffer = self.choose_unpinned_buffer()
+        if buffer is None:
+            return None
+        if buffer.prefetched and self.read_ahead is not None:
+            self.read_ahead.evicted(buffer)
+        buffer.flush()
+        if buffer.block() is not None:
+            del self.buffer_table[buffer.block()]
+        self.free_prefetched.pop(buffer, None)
+        self.replacement.removed(buffer)
+        self.buffer_pool.remove(buffer)
+        self.num_available -= 1
+        buffer.blk = None
+        buffer.prefetched = False
+        return buffer
+    
+    def adopt_buffer(self, buffer):
+        """
+        Adds an unassigned, unpinned buffer given up by another shard to the pool.
+        The caller holds the pool latch.
+        :param buffer: the buffer
+        """
+        buffer.dirty_pages = self.dirty_pages
+        self.buffer_pool.append(buffer)
+        self.replacement.added(buffer)
+        self.num_available += 1
       
     def find_existing_buffer(self, block):
         """
@@ -104,15 +463,21 @@ class BufferManager:
         :param block: the block for which to find the buffer
         :return: the buffer assigned to the block
         """
-        for buffer in self.buffer_pool:
-            if block == buffer.block():
-                return buffer
-        return None
+        return self.buffer_table.get(block)
     
-    def choose_unpinned_buffer(self):
-        for buffer in self.buffer_pool:
-            if not buffer.is_pinned():
-                return buffer
+    def choose_unpinned_buffer(self, evict_prefetched=True):
+        """
+        Chooses an unpinned buffer to reassign. Buffers filled by read-ahead
+        that were never pinned go first, oldest first, since the scan they
+        were read for has usually moved past them; otherwise the replacement
+        policy decides.
+        :param evict_prefetched: whether a prefetched buffer may be chosen;
+                                 read-ahead itself does not evict the blocks it read
+        :return: the chosen buffer, or None if no buffer can be chosen
+        """
+        if evict_prefetched and self.free_prefetched:
+            return next(iter(self.free_prefetched))
+        return self.replacement.victim()
             
 
 class BufferAbortException(RuntimeError):
@@ -0,0 +1,29 @@
+class BufferRing:
+    """
+    A small private set of buffers that a large sequential scan or bulk
+    operation reuses in rotation, so that it does not push the working set
+    of other transactions out of the shared pool.
+
+    Pass the ring to `pin` (of a Transaction, BufferList or buffer manager)
+    for every block of the operation. A block already in the pool is pinned
+    where it is. A block that has to be read goes into the ring's next buffer;
+    while the ring is still filling up, or when that buffer is pinned or no
+    longer holds the block the ring put in it, an ordinary victim is chosen
+    and joins the ring instead, so the ring never evicts another
+    transaction's block. Pins through a ring do not trigger read-ahead.
+
+    In a sharded pool, the ring's buffers are split evenly over the shards.
+    A ring serves one operation, i.e. one thread, at a time.
+    """
+    SIZE = 16
+
+    def __init__(self, size=SIZE):
+        """
+        :param size: the number of buffers of the ring
+        """
+        if size < 1:
+            raise ValueError("A buffer ring needs at least one buffer")
+        self.size = size
+        self.buffers = {}  # buffer manager -> the ring's buffers in it, in rotation order
+        self.blocks = {}  # buffer manager -> the block the ring put in each of its buffers
+        self.hands = {}  # buffer manager -> position of the next buffer to reuse
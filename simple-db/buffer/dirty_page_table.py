@@ -0,0 +1,68 @@
+import threading
+
+
+class DirtyPageTable:
+    """
+    Tracks which buffers each transaction has modified and not yet written,
+    so that a commit or rollback finds its buffers without scanning the pool.
+
+    Buffers report themselves: `Buffer.set_modified` records the buffer under
+    its transaction, and writing the buffer or marking it clean drops it.
+    A buffer belongs to at most one transaction, the one that modified it last.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_tx = {}  # txnum -> set of the buffers it modified last
+
+    def modified(self, buffer, old_txnum, txnum):
+        """
+        Records that a buffer was modified by a transaction.
+
+        :param buffer: the buffer
+        :param old_txnum: the transaction that modified it before, or -1 if it was clean
+        :param txnum: the transaction that modified it now
+        """
+        with self.lock:
+            if old_txnum != txnum:
+                self._discard(buffer, old_txnum)
+            self.by_tx.setdefault(txnum, set()).add(buffer)
+
+    def cleaned(self, buffer, txnum):
+        """
+        Records that a buffer's modifications have been written.
+
+        :param buffer: the buffer
+        :param txnum: the transaction that modified it last, or -1 if it was clean
+        """
+        with self.lock:
+            self._discard(buffer, txnum)
+
+    def buffers_of(self, txnum):
+        """
+        :param txnum: a transaction number
+        :return: list of the buffers the transaction modified last and that are not written yet
+        """
+        with self.lock:
+            return list(self.by_tx.get(txnum, ()))
+
+    def buffers(self):
+        """
+        :return: list of all the buffers modified and not written yet
+        """
+        with self.lock:
+            return [buffer for buffers in self.by_tx.values() for buffer in buffers]
+
+    def count(self):
+        """
+        :return: the number of dirty buffers
+        """
+        with self.lock:
+            return sum(len(buffers) for buffers in self.by_tx.values())
+
+    def _discard(self, buffer, txnum):
+        buffers = self.by_tx.get(txnum)
+        if buffers is not None:
+            buffers.discard(buffer)
+            if not buffers:
+                del self.by_tx[txnum]
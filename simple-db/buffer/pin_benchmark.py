@@ -0,0 +1,127 @@
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from file.block_id import BlockId
+from file.file_manager import FileManager
+from log.durability import NoSync
+from log.log_manager import LogManager
+from .buffer_manager import BufferManager
+from .sharded_buffer_manager import ShardedBufferManager
+
+
+def run(buffer_manager, blocks, threads, pins):
+    """
+    Pins and unpins random blocks from several threads at once.
+
+    :param buffer_manager: a BufferManager or ShardedBufferManager
+    :param blocks: the BlockIds to pin
+    :param threads: the number of threads
+    :param pins: the number of pins per thread
+    :return: pins per second over all threads
+    """
+    start = threading.Barrier(threads + 1)
+
+    def work(seed):
+        rng = random.Random(seed)
+        choices = [rng.choice(blocks) for _ in range(pins)]
+        start.wait()
+        for block in choices:
+            buffer_manager.unpin(buffer_manager.pin(block))
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    began = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads * pins / (time.perf_counter() - began)
+
+
+def latency(buffer_manager, blocks, pins):
+    """
+    Pins and unpins blocks one after the other from a single thread.
+
+    :param buffer_manager: a BufferManager
+    :param blocks: the BlockIds to pin, in order, repeated as needed
+    :param pins: the number of pins
+    :return: mean microseconds per pin and unpin
+    """
+    began = time.perf_counter()
+    for i in range(pins):
+        buffer_manager.unpin(buffer_manager.pin(blocks[i % len(blocks)]))
+    return (time.perf_counter() - began) / pins * 1e6
+
+
+def sweep(file_manager, log_manager, sizes, pins):
+    """
+    Prints the pin latency of pools of several sizes, each filled with as many
+    blocks as it has buffers. A hot pin pins one of the same 8 blocks in the
+    pool, a hit a random block in the pool, and a miss a block not in the
+    pool, replacing the least recently used one. Hot pins show the cost of the
+    pool's own bookkeeping; random hits and misses in a large pool also pay
+    for CPU cache misses on its buffers.
+
+    :param file_manager: the FileManager holding the "bench" file
+    :param log_manager: the LogManager of the pools
+    :param sizes: the pool sizes
+    :param pins: the number of pins per measurement
+    """
+    rng = random.Random(1)
+    print("buffers     hot us     hit us    miss us")
+    for num_buffers in sizes:
+        buffer_manager = BufferManager(num_buffers, file_manager, log_manager)
+        resident = [BlockId.of("bench", n) for n in range(num_buffers)]
+        latency(buffer_manager, resident, num_buffers)  # fills the pool
+        hot = latency(buffer_manager, resident[:8], pins)
+        hit = latency(buffer_manager, [rng.choice(resident) for _ in range(pins)], pins)
+        missing = [BlockId.of("bench", num_buffers + n) for n in range(num_buffers)] + resident
+        miss = latency(buffer_manager, missing, pins)
+        buffer_manager.close()
+        print(f"{num_buffers:>7} {hot:>10.1f} {hit:>10.1f} {miss:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measures pin/unpin latency across pool sizes "
+                                                 "and multi-threaded pin/unpin throughput of a buffer pool.")
+    parser.add_argument("--buffers", type=int, nargs="+", default=[8, 100, 1000, 10000, 100000],
+                        help="pool sizes whose single-thread pin latency is compared")
+    parser.add_argument("--pool", type=int, default=1024, help="size of the pool in the multi-threaded runs")
+    parser.add_argument("--blocks", type=int, default=2048, help="number of distinct blocks pinned")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, ShardedBufferManager.SHARDS],
+                        help="shard counts to compare; 1 is the unsharded BufferManager")
+    parser.add_argument("--pins", type=int, default=20000, help="pins per thread")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as dirname:
+        file_manager = FileManager(dirname, 400)
+        log_manager = LogManager(file_manager, "bench.log", durability=NoSync())
+        for _ in range(args.blocks):
+            file_manager.append("bench")
+        blocks = [BlockId.of("bench", n) for n in range(args.blocks)]
+        for _ in range(args.blocks, 2 * max(args.buffers)):
+            file_manager.append("bench")
+
+        sweep(file_manager, log_manager, args.buffers, args.pins)
+        print()
+        print("threads " + "".join(f"{f'{shards} shards':>14}" for shards in args.shards) + "   (pins/s)")
+        for threads in args.threads:
+            rates = []
+            for shards in args.shards:
+                if shards == 1:
+                    buffer_manager = BufferManager(args.pool, file_manager, log_manager)
+                else:
+                    buffer_manager = ShardedBufferManager(args.pool, file_manager, log_manager, shards=shards)
+                run(buffer_manager, blocks, 1, args.pins // 4)  # warms the pool up
+                rates.append(run(buffer_manager, blocks, threads, args.pins))
+                buffer_manager.close()
+            print(f"{threads:>7} " + "".join(f"{rate:>14,.0f}" for rate in rates))
+        log_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from file.block_id import BlockId
+
+
+class ReadAheadEngine:
+    """
+    Reads blocks into the buffer pool ahead of sequential scans.
+
+    The buffer manager reports every pin. When the pins of a file have
+    been sequential for `trigger` blocks in a row, the next `window` blocks
+    of that file are handed to a pool of worker threads, which read them
+    into unpinned buffers. A scan then usually finds its next block in the pool.
+    A queued block that the scan has already reached by the time a worker
+    gets to it is dropped rather than read.
+
+    Prefetched blocks that are later pinned count as hits; prefetched blocks
+    evicted before anyone pinned them count as waste.
+    """
+    WINDOW = 8
+    TRIGGER = 2
+    WORKERS = 2
+
+    def __init__(self, buffer_manager, file_manager, window=WINDOW, workers=WORKERS, trigger=TRIGGER):
+        """
+        Creates a read-ahead engine for a buffer manager.
+
+        :param buffer_manager: the BufferManager whose free buffers receive the blocks
+        :param file_manager: the FileManager, used to find the end of each file
+        :param window: how many blocks to keep read ahead of a sequential scan
+        :param workers: the number of threads issuing the reads
+        :param trigger: how many consecutive sequential pins start read-ahead
+        """
+        self.buffer_manager = buffer_manager
+        self.file_manager = file_manager
+        self.window = window
+        self.trigger = trigger
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read-ahead")
+        self.lock = threading.Lock()
+
+        self.streams = {}  # filename -> (last block number pinned, length of the sequential run)
+        self.scheduled = {}  # filename -> highest block number handed to the workers
+
+        self.issued = 0
+        self.completed = 0
+        self.skipped = 0
+        self.cancelled = 0
+        self.hits = 0
+        self.wasted = 0
+
+    def accessed(self, block, buffer):
+        """
+        Records a pin and schedules read-ahead if the file is being scanned sequentially.
+
+        :param block: the block that was pinned
+        :param buffer: the buffer it was pinned to
+        """
+        filename = block.file_name()
+        number = block.number()
+        with self.lock:
+            if buffer.prefetched:
+                buffer.prefetched = False
+                self.hits += 1
+
+            last, run = self.streams.get(filename, (-2, 0))
+            if number == last + 1:
+                run += 1
+            elif number != last:
+                run = 1
+                self.scheduled.pop(filename, None)
+            self.streams[filename] = (number, run)
+            if run < self.trigger:
+                return
+
+            start = max(number + 1, self.scheduled.get(filename, -1) + 1)
+            end = min(number + self.window, self.file_manager.length(filename) - 1)
+            if start > end:
+                return
+            self.scheduled[filename] = end
+            self.issued += end - start + 1
+
+        for n in range(start, end + 1):
+            self.executor.submit(self._prefetch, BlockId.of(filename, n))
+
+    def evicted(self, buffer):
+        """
+        Records that a prefetched buffer is being reused before it was ever pinned.
+
+        :param buffer: the buffer being reassigned
+        """
+        with self.lock:
+            buffer.prefetched = False
+            self.wasted += 1
+
+    def stats(self):
+        """
+        Returns the read-ahead counters.
+
+        :return: dict of counter name to value
+        """
+        with self.lock:
+            return {
+                "issued": self.issued,
+                "completed": self.completed,
+                "skipped": self.skipped,
+                "cancelled": self.cancelled,
+                "hits": self.hits,
+                "wasted": self.wasted,
+            }
+
+    def close(self):
+        """
+        Waits for outstanding reads and stops the worker threads.
+        """
+        self.executor.shutdown(wait=True)
+
+    def _prefetch(self, block):
+        """
+        Worker task: reads one block into the pool,
+        unless the scan has pinned it or a later block meanwhile.
+
+        :param block: the block to read
+        """
+        with self.lock:
+            last, _ = self.streams.get(block.file_name(), (-1, 0))
+            if block.number() <= last:
+                self.cancelled += 1
+                return
+        done = self.buffer_manager.prefetch(block)
+        with self.lock:
+            if done:
+                self.completed += 1
+            else:
+                self.skipped += 1
@@ -0,0 +1,305 @@
+import heapq
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class ReplacementPolicy(ABC):
+    """
+    Chooses which unpinned buffer the buffer manager reuses for a new block.
+
+    The buffer manager reports every pin, every buffer whose pin count drops
+    to zero, and every reassignment; `victim` then picks among the unpinned
+    buffers it was told about. Buffers filled by read-ahead and not pinned yet
+    are kept apart by the buffer manager and are not reported as unpinned.
+    """
+    name = None
+
+    def __init__(self, buffers):
+        """
+        :param buffers: every buffer of the pool; all start out unpinned
+        """
+        self.buffers = list(buffers)
+
+    @staticmethod
+    def create(name, buffers):
+        """
+        Creates the policy registered under a name.
+
+        :param name: one of the keys of POLICIES
+        :param buffers: every buffer of the pool
+        :return: the new policy
+        """
+        try:
+            policy_class = POLICIES[name]
+        except KeyError:
+            raise ValueError(f"Unknown buffer replacement policy {name!r}; choose one of {sorted(POLICIES)}")
+        return policy_class(buffers)
+
+    @abstractmethod
+    def pinned(self, buffer):
+        """
+        Records an access: the buffer was pinned for its current block.
+
+        :param buffer: the buffer
+        """
+        pass
+
+    @abstractmethod
+    def unpinned(self, buffer):
+        """
+        Records that the buffer's pin count dropped to zero, making it a candidate.
+
+        :param buffer: the buffer
+        """
+        pass
+
+    def reserved(self, buffer):
+        """
+        Records that an unpinned buffer was taken without an access to its block,
+        as read-ahead does while it fills a buffer.
+
+        :param buffer: the buffer
+        """
+        self.pinned(buffer)
+
+    def added(self, buffer):
+        """
+        Records that an unassigned, unpinned buffer joined the pool,
+        as when a sharded pool moves a buffer between shards.
+
+        :param buffer: the buffer
+        """
+        self.buffers.append(buffer)
+        self.unpinned(buffer)
+
+    def removed(self, buffer):
+        """
+        Records that an unpinned buffer left the pool.
+
+        :param buffer: the buffer
+        """
+        self.buffers.remove(buffer)
+        self.reserved(buffer)
+
+    def assigned(self, buffer, old_block, new_block):
+        """
+        Records that a victim was reassigned from one block to another.
+
+        :param buffer: the buffer
+        :param old_block: the block it held, or None
+        :param new_block: the block it holds now
+        """
+        pass
+
+    @abstractmethod
+    def victim(self):
+        """
+        Returns the unpinned buffer to reuse, without removing it;
+        the buffer manager pins it next.
+
+        :return: the buffer, or None if no buffer is unpinned
+        """
+        pass
+
+
+class LRUPolicy(ReplacementPolicy):
+    """
+    Reuses the least recently unpinned buffer.
+    """
+    name = "lru"
+
+    def __init__(self, buffers):
+        super().__init__(buffers)
+        self.free = OrderedDict.fromkeys(self.buffers)  # unpinned buffers, least recently unpinned first
+
+    def pinned(self, buffer):
+        self.free.pop(buffer, None)
+
+    def unpinned(self, buffer):
+        self.free[buffer] = None
+
+    def added(self, buffer):
+        super().added(buffer)
+        self.free.move_to_end(buffer, last=False)  # an empty buffer is reused first
+
+    def victim(self):
+        return next(iter(self.free), None)
+
+
+class ClockPolicy(ReplacementPolicy):
+    """
+    Second-chance replacement: a hand sweeps the pool, skipping pinned
+    buffers and clearing the reference bit of buffers pinned since its last
+    pass; the first unpinned buffer without the bit is reused.
+    """
+    name = "clock"
+
+    def __init__(self, buffers):
+        super().__init__(buffers)
+        self.referenced = [False] * len(self.buffers)
+        self.positions = {buffer: i for i, buffer in enumerate(self.buffers)}
+        self.candidates = set(self.buffers)
+        self.holes = []  # positions of removed buffers, reused by added ones
+        self.hand = 0
+
+    def pinned(self, buffer):
+        self.candidates.discard(buffer)
+        self.referenced[self.positions[buffer]] = True
+
+    def unpinned(self, buffer):
+        self.candidates.add(buffer)
+
+    def reserved(self, buffer):
+        self.candidates.discard(buffer)
+
+    def added(self, buffer):
+        if self.holes:
+            i = self.holes.pop()
+            self.buffers[i] = buffer
+            self.referenced[i] = False
+        else:
+            i = len(self.buffers)
+            self.buffers.append(buffer)
+            self.referenced.append(False)
+        self.positions[buffer] = i
+        self.candidates.add(buffer)
+
+    def removed(self, buffer):
+        i = self.positions.pop(buffer)
+        self.buffers[i] = None  # the hand skips it, as it is no candidate
+        self.holes.append(i)
+        self.candidates.discard(buffer)
+
+    def victim(self):
+        if not self.candidates:
+            return None
+        while True:  # ends within two sweeps, since a candidate exists
+            i = self.hand
+            self.hand = (i + 1) % len(self.buffers)
+            buffer = self.buffers[i]
+            if buffer not in self.candidates:
+                continue
+            if self.referenced[i]:
+                self.referenced[i] = False
+                continue
+            return buffer
+
+
+class LRU2Policy(ReplacementPolicy):
+    """
+    LRU-K with K = 2: reuses the buffer whose block has the oldest
+    second-to-last access. Blocks accessed only once count as infinitely old,
+    so a one-time scan cannot push out blocks that are accessed repeatedly.
+    The access history of a block outlives its eviction for a while,
+    bounded to a few times the pool size.
+    """
+    name = "lru2"
+    HISTORY = 4  # blocks of history kept per buffer
+
+    def __init__(self, buffers):
+        super().__init__(buffers)
+        self.clock = 0
+        self.history = OrderedDict()  # block -> (second-to-last access, last access), oldest first
+        self.heap = []  # (second-to-last access, last access, entry number, buffer)
+        self.entries = {}  # unpinned buffer -> its live heap entry
+        for buffer in self.buffers:
+            self.unpinned(buffer)
+
+    def pinned(self, buffer):
+        self.entries.pop(buffer, None)
+        block = buffer.block()
+        if block is None:
+            return
+        self.clock += 1
+        _, last = self.history.pop(block, (-1, -1))
+        self.history[block] = (last, self.clock)
+        if len(self.history) > self.HISTORY * len(self.buffers):
+            self.history.popitem(last=False)
+
+    def reserved(self, buffer):
+        self.entries.pop(buffer, None)
+
+    def unpinned(self, buffer):
+        previous, last = self.history.get(buffer.block(), (-1, -1))
+        self.clock += 1
+        entry = self.entries[buffer] = (previous, last, self.clock, buffer)
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > self.HISTORY * len(self.buffers):
+            self.heap = list(self.entries.values())  # drop the entries of buffers pinned since
+            heapq.heapify(self.heap)
+
+    def victim(self):
+        while self.heap and self.entries.get(self.heap[0][3]) is not self.heap[0]:
+            heapq.heappop(self.heap)  # the buffer was pinned since this entry was made
+        return self.heap[0][3] if self.heap else None
+
+
+class TwoQPolicy(ReplacementPolicy):
+    """
+    2Q replacement. A block read for the first time enters the FIFO queue A1in;
+    a block that is read again after leaving A1in (and is still remembered
+    in the ghost queue A1out) enters the LRU queue Am. A1in is emptied first
+    once it holds more than a quarter of the pool, so blocks touched once
+    by a scan leave quickly, while hot blocks stay in Am.
+    """
+    name = "2q"
+
+    def __init__(self, buffers):
+        super().__init__(buffers)
+        self.kin = max(1, len(self.buffers) // 4)
+        self.kout = max(1, len(self.buffers) // 2)
+        self.a1in = OrderedDict()  # buffers of blocks seen once, oldest first
+        self.am = OrderedDict()  # buffers of hot blocks, least recently used first
+        self.a1out = OrderedDict()  # blocks recently evicted from A1in
+        self.empty = OrderedDict.fromkeys(self.buffers)  # buffers not assigned to a block yet
+        self.candidates = set(self.buffers)
+
+    def pinned(self, buffer):
+        self.candidates.discard(buffer)
+        if buffer in self.am:
+            self.am.move_to_end(buffer)
+
+    def unpinned(self, buffer):
+        self.candidates.add(buffer)
+
+    def reserved(self, buffer):
+        self.candidates.discard(buffer)
+
+    def added(self, buffer):
+        super().added(buffer)
+        self.empty[buffer] = None
+
+    def removed(self, buffer):
+        super().removed(buffer)
+        self.empty.pop(buffer, None)
+        self.am.pop(buffer, None)
+        self.a1in.pop(buffer, None)
+
+    def assigned(self, buffer, old_block, new_block):
+        self.empty.pop(buffer, None)
+        self.am.pop(buffer, None)
+        if buffer in self.a1in:
+            del self.a1in[buffer]
+            self.a1out[old_block] = None
+            if len(self.a1out) > self.kout:
+                self.a1out.popitem(last=False)
+
+        if new_block in self.a1out:
+            del self.a1out[new_block]
+            self.am[buffer] = None
+        else:
+            self.a1in[buffer] = None
+
+    def victim(self):
+        for buffer in self.empty:
+            if buffer in self.candidates:
+                return buffer
+        queues = (self.a1in, self.am) if len(self.a1in) > self.kin else (self.am, self.a1in)
+        for queue in queues:
+            for buffer in queue:
+                if buffer in self.candidates:
+                    return buffer
+        return None
+
+
+POLICIES = {policy.name: policy for policy in (LRUPolicy, ClockPolicy, LRU2Policy, TwoQPolicy)}
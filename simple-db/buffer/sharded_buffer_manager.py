@@ -0,0 +1,164 @@
+from .background_writer import BackgroundWriter
+from .buffer_manager import BufferManager
+from .read_ahead import ReadAheadEngine
+
+
+class ShardedBufferManager:
+    """
+    A buffer pool partitioned into shards, so that threads pinning different
+    blocks seldom contend for the same latch.
+
+    Each block belongs to the shard its hash selects. A shard is a BufferManager
+    of its own, with its own latch, block table, replacement state and waiters.
+    A shard starts with an equal share of the buffers; when it has no unpinned
+    buffer left, the balancer moves one over from the shard with the most
+    unpinned buffers, so that a skewed workload can pin more blocks of one
+    shard at a time than the shard's share of the pool.
+    The balancer only tries the other shards' latches without blocking,
+    so two shards borrowing from each other cannot deadlock.
+
+    It offers the same interface as BufferManager.
+    """
+    SHARDS = 8
+    RETRY = 10  # milliseconds a shard's waiters wait before trying to borrow again
+
+    def __init__(self, num_buffers, file_manager, log_manager, shards=SHARDS,
+                 read_ahead_window=0, read_ahead_workers=ReadAheadEngine.WORKERS,
+                 replacement=BufferManager.REPLACEMENT, max_wait=BufferManager.MAX_TIME,
+                 clean_target=0, writer_interval=BackgroundWriter.INTERVAL):
+        """
+        Creates a sharded buffer pool.
+        :param num_buffers: Number of buffer slots to allocate, over all shards.
+        :param file_manager: Instance of FileManager for file operations.
+        :param log_manager: Instance of LogManager for logging operations.
+        :param shards: Number of shards, at most num_buffers.
+        :param read_ahead_window: Number of blocks read ahead of a sequential scan, 0 to disable read-ahead.
+        :param read_ahead_workers: Number of threads issuing read-ahead I/O.
+        :param replacement: Name of the replacement policy each shard uses.
+        :param max_wait: Milliseconds a pin waits for a free buffer before raising BufferAbortException.
+        :param clean_target: Share of each shard a background writer keeps clean, 0 to disable the writers.
+        :param writer_interval: Milliseconds between the background writers' passes.
+        """
+        if not 0 < shards <= num_buffers:
+            raise ValueError(f"Cannot split {num_buffers} buffers into {shards} shards")
+        self.file_manager = file_manager
+        self.log_manager = log_manager
+        self.shards = [BufferManager(num_buffers // shards + (i < num_buffers % shards), file_manager, log_manager,
+                                     replacement=replacement, max_wait=max_wait,
+                                     clean_target=clean_target, writer_interval=writer_interval)
+                       for i in range(shards)]
+        for shard in self.shards:
+            shard.balancer = self
+        self.waiting = set()  # shards that have threads waiting for a buffer
+        self.moved = 0  # buffers moved between shards
+        self.trace = None  # list of the blocks pinned, while recording a trace (see trace_replay.py)
+        self.read_ahead = None
+        if read_ahead_window > 0:
+            self.read_ahead = ReadAheadEngine(self, file_manager, read_ahead_window, read_ahead_workers)
+            for shard in self.shards:
+                shard.read_ahead = self.read_ahead  # the shards report pins and evictions; prefetches come back here
+
+    def shard_of(self, block):
+        """
+        :param block: a BlockId
+        :return: the shard holding the block
+        """
+        return self.shards[hash(block) % len(self.shards)]
+
+    def available(self):
+        """
+        Returns the number of available (i.e. unpinned) buffers over all shards.
+        :return: the number of available buffers
+        """
+        return sum(shard.available() for shard in self.shards)
+
+    def pin(self, block, ring=None):
+        """
+        Pins a buffer to the specified block in the block's shard,
+        potentially waiting until a buffer becomes available.
+        :param block: the block to which the buffer should be pinned
+        :param ring: a BufferRing confining a scan or bulk operation to a few buffers, or None
+        :return: the buffer pinned to the block
+        """
+        buffer = self.shard_of(block).pin(block, ring)
+        if self.trace is not None:
+            self.trace.append(block)
+        return buffer
+
+    def unpin(self, buffer):
+        """
+        Unpins the specified data buffer. If its pin count drops to zero,
+        threads waiting in other shards are woken up, since they may borrow it.
+        :param buffer: the buffer to be unpinned
+        """
+        shard = self.shard_of(buffer.block())
+        shard.unpin(buffer)
+        if self.waiting and not buffer.is_pinned():
+            for other in list(self.waiting):
+                if other is not shard:
+                    with other.lock:
+                        other.buffer_freed.notify_all()
+
+    def flush_all(self, txnum):
+        """
+        Flushes the dirty buffers modified by the specified transaction in every shard,
+        then syncs their files once, as the log's durability policy dictates.
+        :param txnum: the transaction's id number
+        """
+        filenames = set()
+        for shard in self.shards:
+            filenames |= shard.write_modified(txnum)
+        if filenames:
+            self.log_manager.sync_data(filenames)
+
+    def stats(self):
+        """
+        Returns the counters and latency histograms of all shards added up; times are in seconds.
+        :return: dict of counter name to value
+        """
+        stats = BufferManager.pool_stats(self.shards)
+        stats["shards"] = len(self.shards)
+        stats["moved"] = self.moved
+        if self.read_ahead is not None:
+            stats["read_ahead"] = self.read_ahead.stats()
+        return stats
+
+    def prefetch(self, block):
+        """
+        Reads the specified block into an unpinned buffer of its shard without pinning it.
+        :param block: the block to read ahead
+        :return: True if the block was read
+        """
+        return self.shard_of(block).prefetch(block)
+
+    def borrow(self, receiver):
+        """
+        Moves an unpinned buffer from another shard to a shard that has none left.
+        The shard with the most unpinned buffers gives one up, unless its latch is busy.
+        The receiving shard calls this with its own latch held.
+        :param receiver: the shard short of buffers
+        :return: the buffer, now part of the receiver's pool, or None if no shard can spare one
+        """
+        donors = sorted((shard for shard in self.shards if shard is not receiver),
+                        key=lambda shard: shard.num_available, reverse=True)
+        for donor in donors:
+            if donor.num_available == 0:
+                break
+            if not donor.lock.acquire(blocking=False):
+                continue
+            try:
+                buffer = donor.give_up_buffer()
+            finally:
+                donor.lock.release()
+            if buffer is not None:
+                receiver.adopt_buffer(buffer)
+                self.moved += 1
+                return buffer
+        return None
+
+    def close(self):
+        """
+        Stops the background threads of every shard and the read-ahead workers.
+        """
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,100 @@
+import argparse
+
+from file.block_id import BlockId
+from .replacement import POLICIES, ReplacementPolicy
+
+
+class TraceBuffer:
+    """
+    A stand-in for Buffer during replay: it only remembers its block.
+    """
+
+    def __init__(self):
+        self.blk = None
+
+    def block(self):
+        return self.blk
+
+
+def save_trace(path, blocks):
+    """
+    Writes a pin trace, one "filename block-number" line per pin.
+    A trace is recorded by setting `BufferManager.trace` to a list.
+
+    :param path: the trace file
+    :param blocks: the pinned BlockIds, in order
+    """
+    with open(path, "w") as f:
+        for block in blocks:
+            f.write(f"{block.file_name()} {block.number()}\n")
+
+
+def load_trace(path):
+    """
+    Reads a pin trace written by `save_trace`.
+
+    :param path: the trace file
+    :return: list of BlockIds
+    """
+    blocks = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                filename, number = line.rsplit(maxsplit=1)
+                blocks.append(BlockId.of(filename, int(number)))
+    return blocks
+
+
+def replay(trace, policy, num_buffers):
+    """
+    Replays a pin trace against a replacement policy, without any I/O.
+    Each pin is unpinned before the next one, and a miss reuses
+    the buffer the policy chooses, as BufferManager.try_to_pin does.
+
+    :param trace: list of BlockIds
+    :param policy: the name of a replacement policy
+    :param num_buffers: the size of the simulated pool
+    :return: dict with the number of hits and misses and the hit ratio
+    """
+    buffers = [TraceBuffer() for _ in range(num_buffers)]
+    replacement = ReplacementPolicy.create(policy, buffers)
+    table = {}
+    hits = 0
+    for block in trace:
+        buffer = table.get(block)
+        if buffer is not None:
+            hits += 1
+        else:
+            buffer = replacement.victim()
+            old = buffer.blk
+            if old is not None:
+                del table[old]
+            buffer.blk = block
+            table[block] = buffer
+            replacement.assigned(buffer, old, block)
+        replacement.pinned(buffer)
+        replacement.unpinned(buffer)
+    return {
+        "hits": hits,
+        "misses": len(trace) - hits,
+        "hit_ratio": hits / len(trace) if trace else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replays a buffer pin trace and reports hit ratios.")
+    parser.add_argument("trace", help="trace file, one 'filename block-number' line per pin")
+    parser.add_argument("--buffers", type=int, nargs="+", default=[8, 64, 512], help="pool sizes to simulate")
+    parser.add_argument("--policies", nargs="+", default=sorted(POLICIES), choices=sorted(POLICIES))
+    args = parser.parse_args(argv)
+
+    trace = load_trace(args.trace)
+    print(f"{len(trace)} pins of {len(set(trace))} distinct blocks")
+    print("buffers " + "".join(f"{policy:>8}" for policy in args.policies))
+    for num_buffers in args.buffers:
+        ratios = [replay(trace, policy, num_buffers)["hit_ratio"] for policy in args.policies]
+        print(f"{num_buffers:>7} " + "".join(f"{ratio:>8.3f}" for ratio in ratios))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,94 @@
+import threading
+import weakref
+
 
 class BlockId:
+    """
+    Identifies a disk block by its file name and block number.
+    BlockIds are immutable. Each file name is mapped to a small integer file id,
+    so hashing and equality work on two ints instead of on the file name.
+    """
+    __slots__ = ('_filename', '_number', '_file_id', '_hash', '__weakref__')
+
+    _file_ids = {}  # filename -> file id, shared by all BlockIds
+    _file_ids_lock = threading.Lock()
+    _interned = weakref.WeakValueDictionary()
+
     def __init__(self, filename, block_number):
-        self.filename = filename
-        self.block_number = block_number
-        
+        file_id = BlockId.file_id_of(filename)
+        object.__setattr__(self, '_filename', filename)
+        object.__setattr__(self, '_number', block_number)
+        object.__setattr__(self, '_file_id', file_id)
+        object.__setattr__(self, '_hash', hash((file_id, block_number)))
+
+    @classmethod
+    def of(cls, filename, block_number):
+        """
+        Returns the interned BlockId for the block, creating it if needed.
+        Repeated lookups of a hot block return the same instance
+        instead of allocating a new one.
+
+        :param filename: the name of the file
+        :param block_number: the block number within the file
+        :return: the shared BlockId instance
+        """
+        key = (cls.file_id_of(filename), block_number)
+        block = cls._interned.get(key)
+        if block is None:
+            block = cls(filename, block_number)
+            cls._interned[key] = block
+        return block
+
+    @classmethod
+    def file_id_of(cls, filename):
+        """
+        Returns the small integer id assigned to a file name,
+        assigning the next free id the first time the name is seen.
+
+        :param filename: the name of the file
+        :return: the file id
+        """
+        file_id = cls._file_ids.get(filename)
+        if file_id is None:
+            with cls._file_ids_lock:
+                file_id = cls._file_ids.setdefault(filename, len(cls._file_ids))
+        return file_id
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BlockId is immutable")
+
+    def file_name(self):
+        return self._filename
+
     def filename(self):
-        return self.filename
-    
+        return self._filename
+
     def number(self):
-        return self.block_number
-    
-    def equals(self, obj):
+        return self._number
+
+    def file_id(self):
+        return self._file_id
+
+    def __eq__(self, obj):
+        if self is obj:
+            return True
         if not isinstance(obj, BlockId):
-            return False
-        return self.filename == obj.filename and self.block_number == obj.block_number
-    
+            return NotImplemented
+        return self._file_id == obj._file_id and self._number == obj._number
+
+    def __hash__(self):
+        return self._hash
+
+    def __str__(self):
+        return f"[file {self._filename}, block {self._number}]"
+
+    __repr__ = __str__
+
+    def equals(self, obj):
+        return self == obj
+
     def to_string(self):
-        return f"[file {self.filename}, block {self.block_number}]"
-    
+        return str(self)
+
     def hash_code(self):
-        return hash((self.to_string()))
\ No newline at end of file
+        return self._hash
@@ -0,0 +1,48 @@
+import zlib
+from abc import ABC, abstractmethod
+
+
+class Codec(ABC):
+    """
+    Compresses and decompresses the contents of single blocks
+    for the CompressedFileManager.
+    """
+
+    @abstractmethod
+    def compress(self, data) -> bytes:
+        """
+        Compresses the contents of a block.
+
+        :param data: a bytes-like object holding one block
+        :return: the compressed bytes
+        """
+        pass
+
+    @abstractmethod
+    def decompress(self, data, block_size) -> bytes:
+        """
+        Restores the contents of a block.
+
+        :param data: the compressed bytes
+        :param block_size: the size of the uncompressed block
+        :return: the uncompressed bytes
+        """
+        pass
+
+
+class ZlibCodec(Codec):
+    """
+    Block compression with zlib from the standard library.
+    """
+
+    def __init__(self, level=1):
+        """
+        :param level: the zlib compression level, 1 (fastest) to 9 (smallest)
+        """
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data, block_size):
+        return zlib.decompress(data, bufsize=block_size)
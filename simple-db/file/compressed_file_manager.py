@@ -0,0 +1,457 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .block_id import BlockId
+from .codec import ZlibCodec
+from .file_handle_pool import FileHandlePool
+from .file_manager import FileManager
+
+
+class CompressedFileManager(FileManager):
+    """
+    A FileManager that stores the blocks of data files compressed,
+    while pages and buffers keep seeing uncompressed `block_size` pages.
+
+    A compressed file is a sequence of records, each a header
+    (block number, stored length, flags, CRC-32) followed by the block's payload.
+    Writing a block appends a new record and supersedes the previous one,
+    so the file is laid out in write order rather than block order.
+    Once superseded records take up more than half of a file, and at least
+    COMPACT_MIN bytes, the file is compacted while it stays in use.
+    When the file is closed, a block map (the location of the latest
+    record of every block) is written after the records, followed by a footer
+    pointing at it and holding the file's number of blocks, so reopening the
+    file does not have to scan the records and keeps blocks appended but never
+    written. If the footer is missing, e.g. after a crash, the records are
+    scanned instead, up to the first one whose checksum does not match.
+
+    Files whose names start with one of the `uncompressed` prefixes,
+    e.g. the log, are stored raw, exactly as FileManager stores them.
+    """
+    HEADER = struct.Struct('>iIBI')  # block number, stored length, flags, CRC-32 of the other fields and the payload
+    MAP_ENTRY = struct.Struct('>iQIB')  # block number, payload offset, stored length, flags
+    FOOTER = struct.Struct('>QIi4s')  # block map offset, number of map entries, number of blocks, magic
+    MAGIC = b'SDB2'
+    COMPRESSED = 1  # flag: the payload must be decompressed; otherwise it is the raw block
+    COMPACT_MIN = 64 * 1024  # bytes of superseded records a file may hold before it is compacted
+
+    def __init__(self, db_directory, block_size, codec=None, uncompressed=(),
+                 extent_size=FileManager.EXTENT_SIZE, max_open_files=FileHandlePool.MAX_OPEN):
+        """
+        Initializes the compressing File Manager.
+
+        :param db_directory: Path to the database directory
+        :param block_size: The size of a single block in bytes
+        :param codec: The Codec used to compress blocks, zlib by default
+        :param uncompressed: File name prefixes of the files stored raw
+        :param extent_size: Number of bytes a raw file grows by when an append needs space
+        :param max_open_files: Number of file descriptors kept open at most
+        """
+        super().__init__(db_directory, block_size, extent_size, max_open_files)
+        self.codec = codec if codec is not None else ZlibCodec()
+        self.uncompressed = tuple(uncompressed)
+
+        self.block_maps = {}  # filename -> {block number: (payload offset, stored length, flags)}
+        self.data_ends = {}  # filename -> offset of the next record
+        self.garbage = {}  # filename -> bytes held by superseded records
+        self.sealed = set()  # files that still end with a block map
+        self.sealed_counts = {}  # filename -> number of blocks read from the footer, until the length is loaded
+        self.map_lock = threading.RLock()  # also held around compressed file I/O, so compaction can move records
+
+        self.logical_bytes_read = 0
+        self.stored_bytes_read = 0
+        self.logical_bytes_written = 0
+        self.stored_bytes_written = 0
+        self.compactions = 0
+
+    def is_compressed(self, filename):
+        """
+        Returns whether the blocks of the file are stored compressed.
+
+        :param filename: The file name
+        """
+        return not filename.startswith(self.uncompressed)
+
+    def read_block(self, block, page):
+        """
+        Reads the latest record of a block and decompresses it into the page.
+
+        :param block: BlockId object representing the block to read
+        :param page: Page object to store the read data
+        """
+        filename = block.file_name()
+        if not self.is_compressed(filename):
+            return super().read_block(block, page)
+
+        began = time.perf_counter()
+        try:
+            with self.map_lock:
+                entry = self._block_map(filename).get(block.number())
+                if entry is None:  # appended but never written
+                    page.contents()[:] = bytes(self._block_size)
+                    return
+
+                offset, length, flags = entry
+                with self.file_handles.open(filename) as fd:
+                    data = os.pread(fd, length, offset)
+            page.contents()[:] = self.codec.decompress(data, self._block_size) if flags & self.COMPRESSED else data
+
+            self.logical_bytes_read += self._block_size
+            self.stored_bytes_read += length
+        except Exception as e:
+            raise RuntimeError(f"Error reading block {block} from disk: {e}")
+        self._count_read(1, began)
+
+    def write(self, block, page):
+        """
+        Compresses a page and appends it to the file as the block's latest record.
+
+        :param block: BlockId object representing the block to write
+        :param page: Page object containing the data to write
+        """
+        if not self.is_compressed(block.file_name()):
+            return super().write(block, page)
+        self._write_records(block.file_name(), [block], [page])
+
+    def read_blocks(self, blocks, pages):
+        """
+        Reads several blocks, one page per block.
+        Raw files are read with vectored reads; compressed blocks one record at a time.
+
+        :param blocks: list of BlockId objects to read
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        raw = []
+        for block, page in zip(blocks, pages):
+            if self.is_compressed(block.file_name()):
+                self.read_block(block, page)
+            else:
+                raw.append((block, page))
+        if raw:
+            super().read_blocks(*zip(*raw))
+
+    def write_blocks(self, blocks, pages):
+        """
+        Writes several pages, one page per block.
+        The records of each compressed file are appended with a single vectored write.
+
+        :param blocks: list of BlockId objects to write
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        raw = []
+        by_file = {}
+        for block, page in zip(blocks, pages):
+            if self.is_compressed(block.file_name()):
+                file_blocks, file_pages = by_file.setdefault(block.file_name(), ([], []))
+                file_blocks.append(block)
+                file_pages.append(page)
+            else:
+                raw.append((block, page))
+
+        for filename, (file_blocks, file_pages) in by_file.items():
+            self._write_records(filename, file_blocks, file_pages)
+        if raw:
+            super().write_blocks(*zip(*raw))
+
+    def sync(self, filename):
+        """
+        Forces the file's written blocks to stable storage.
+        A compressed file is not compacted meanwhile.
+
+        :param filename: Name of the file to sync
+        """
+        if not self.is_compressed(filename):
+            return super().sync(filename)
+        with self.map_lock:
+            super().sync(filename)
+
+    def append(self, filename):
+        """
+        Appends a new empty block to the file.
+        A compressed block takes no space until it is first written.
+
+        :param filename: Name of the file to append to
+        :return: BlockId of the newly added block
+        """
+        if not self.is_compressed(filename):
+            return super().append(filename)
+
+        with self.map_lock:
+            new_block_num = self.length(filename)
+            self.block_counts[filename] = new_block_num + 1
+        return BlockId.of(filename, new_block_num)
+
+    def compact(self, filename):
+        """
+        Rewrites a compressed file with only the latest record of each block,
+        in block order, reclaiming the space of superseded records.
+
+        :param filename: The file name
+        """
+        with self.map_lock:
+            block_map = self._block_map(filename)
+            tmp_path = self.db_directory / (filename + ".compact")
+            new_map = {}
+            pos = 0
+
+            out = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                with self.file_handles.open(filename) as fd:
+                    for n in sorted(block_map):
+                        offset, length, flags = block_map[n]
+                        payload = os.pread(fd, length, offset)
+                        os.write(out, self._header(n, flags, payload) + payload)
+                        new_map[n] = (pos + self.HEADER.size, length, flags)
+                        pos += self.HEADER.size + length
+                os.fsync(out)
+            finally:
+                os.close(out)
+
+            self.file_handles.discard(filename)
+            os.replace(tmp_path, self.db_directory / filename)
+            self.sync_directory()
+            self.block_maps[filename] = new_map
+            self.data_ends[filename] = pos
+            self.garbage[filename] = 0
+            self.sealed.discard(filename)
+            self.compactions += 1
+
+    def preallocate(self, filename, size):
+        """
+        Preallocates a raw file; compressed files only ever grow by their records.
+
+        :param filename: The file name
+        :param size: Number of bytes to allocate
+        """
+        if not self.is_compressed(filename):
+            super().preallocate(filename, size)
+
+    def delete(self, filename):
+        """
+        Forgets the block map of the file, then removes it.
+
+        :param filename: The file name
+        """
+        with self.map_lock:
+            self.block_maps.pop(filename, None)
+            self.data_ends.pop(filename, None)
+            self.garbage.pop(filename, None)
+            self.sealed.discard(filename)
+            self.sealed_counts.pop(filename, None)
+            super().delete(filename)
+
+    def compression_stats(self):
+        """
+        Returns the logical (uncompressed) and stored byte counts
+        of the compressed blocks read and written so far.
+        """
+        return {
+            "logical_bytes_read": self.logical_bytes_read,
+            "stored_bytes_read": self.stored_bytes_read,
+            "logical_bytes_written": self.logical_bytes_written,
+            "stored_bytes_written": self.stored_bytes_written,
+            "compactions": self.compactions,
+            "garbage_bytes": sum(self.garbage.values()),
+        }
+
+    def close(self):
+        """
+        Compacts compressed files that are mostly superseded records,
+        writes the block map of each compressed file, then closes every file.
+        """
+        with self.map_lock:
+            for filename in list(self.block_maps):
+                if self.garbage[filename] > self.data_ends[filename] // 2:
+                    self.compact(filename)
+                if filename not in self.sealed:
+                    self._write_block_map(filename)
+                self.block_counts.pop(filename, None)  # nothing to trim; the footer holds the count
+
+            self.block_maps.clear()
+            self.data_ends.clear()
+            self.garbage.clear()
+            self.sealed.clear()
+            self.sealed_counts.clear()
+            super().close()
+
+    def _load_length(self, filename):
+        """
+        Initializes the cached block count of a file.
+        A compressed file closed cleanly holds the number of blocks in its footer.
+        After a crash it holds its highest written block number plus one,
+        or the number of blocks recorded at its last sync if that is more.
+
+        :param filename: The file name
+        """
+        if not self.is_compressed(filename):
+            return super()._load_length(filename)
+        block_map = self._block_map(filename)
+        self.block_counts[filename] = max(self.sealed_counts.pop(filename, 0), self.durable_lengths.get(filename, 0),
+                                          max(block_map, default=-1) + 1)
+
+    def _write_records(self, filename, blocks, pages):
+        """
+        Compresses the pages and appends one record per block to the file.
+        Blocks that do not shrink are stored raw.
+
+        :param filename: The file name
+        :param blocks: list of BlockId objects of that file
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        records = []
+        entries = []
+        size = 0
+        for block, page in zip(blocks, pages):
+            payload = self.codec.compress(page.contents())
+            flags = self.COMPRESSED
+            if len(payload) >= self._block_size:
+                payload = bytes(page.contents())
+                flags = 0
+            records += [self._header(block.number(), flags, payload), payload]
+            entries.append((block.number(), size + self.HEADER.size, len(payload), flags))
+            size += self.HEADER.size + len(payload)
+
+        began = time.perf_counter()
+        with self.map_lock:
+            try:
+                block_map = self._block_map(filename)
+                if filename in self.sealed:
+                    self._unseal(filename)
+                start = pos = self.data_ends[filename]
+                with self.file_handles.open(filename) as fd:
+                    for i in range(0, len(records), self.IOV_MAX):
+                        chunk = records[i:i + self.IOV_MAX]
+                        os.pwritev(fd, chunk, pos)
+                        pos += sum(map(len, chunk))
+                self.data_ends[filename] = pos
+            except Exception as e:
+                raise RuntimeError(f"Error writing blocks of {filename} to disk: {e}")
+            self._count_write(len(blocks), began)
+
+            for n, offset, length, flags in entries:
+                old = block_map.get(n)
+                if old is not None:
+                    self.garbage[filename] += self.HEADER.size + old[1]
+                block_map[n] = (start + offset, length, flags)
+            self.block_counts[filename] = max(self.block_counts.get(filename, 0), max(block_map) + 1)
+
+            self.logical_bytes_written += len(blocks) * self._block_size
+            self.stored_bytes_written += size
+
+            garbage = self.garbage[filename]
+            if garbage >= self.COMPACT_MIN and garbage > self.data_ends[filename] // 2:
+                self.compact(filename)
+
+    def _header(self, n, flags, payload):
+        """
+        Packs the header of a record.
+
+        :param n: the block number
+        :param flags: the record's flags
+        :param payload: the stored bytes of the block
+        :return: the packed header
+        """
+        return self.HEADER.pack(n, len(payload), flags, self._checksum(n, flags, payload))
+
+    @staticmethod
+    def _checksum(n, flags, payload):
+        """
+        Returns the CRC-32 of a record's header fields and payload.
+
+        :param n: the block number
+        :param flags: the record's flags
+        :param payload: the stored bytes of the block
+        """
+        return zlib.crc32(payload, zlib.crc32(struct.pack('>iIB', n, len(payload), flags)))
+
+    def _block_map(self, filename):
+        """
+        Returns the block map of a compressed file, loading it on first use.
+
+        :param filename: The file name
+        :return: dict of block number to (payload offset, stored length, flags)
+        """
+        block_map = self.block_maps.get(filename)
+        if block_map is None:
+            with self.map_lock:
+                if filename not in self.block_maps:
+                    self._load_block_map(filename)
+                block_map = self.block_maps[filename]
+        return block_map
+
+    def _load_block_map(self, filename):
+        """
+        Reads the block map written by `close`, or rebuilds it by scanning
+        the record headers if the file was not closed cleanly.
+
+        :param filename: The file name
+        """
+        block_map = {}
+        live = 0
+        with self.file_handles.open(filename) as fd:
+            size = os.fstat(fd).st_size
+            map_offset, count, blocks, magic = (0, 0, 0, b'')
+            if size >= self.FOOTER.size:
+                map_offset, count, blocks, magic = self.FOOTER.unpack(
+                    os.pread(fd, self.FOOTER.size, size - self.FOOTER.size))
+
+            if magic == self.MAGIC and map_offset + count * self.MAP_ENTRY.size + self.FOOTER.size == size:
+                entries = os.pread(fd, count * self.MAP_ENTRY.size, map_offset)
+                for n, offset, length, flags in self.MAP_ENTRY.iter_unpack(entries):
+                    block_map[n] = (offset, length, flags)
+                    live += self.HEADER.size + length
+                data_end = map_offset
+                self.sealed.add(filename)
+                self.sealed_counts[filename] = blocks
+            else:
+                pos = 0
+                while pos + self.HEADER.size <= size:
+                    n, length, flags, crc = self.HEADER.unpack(os.pread(fd, self.HEADER.size, pos))
+                    if pos + self.HEADER.size + length > size:
+                        break  # torn record at the end of the file
+                    payload = os.pread(fd, length, pos + self.HEADER.size)
+                    if self._checksum(n, flags, payload) != crc:
+                        break  # torn or corrupt record: it and everything after it are dropped
+                    old = block_map.get(n)
+                    if old is not None:
+                        live -= self.HEADER.size + old[1]
+                    block_map[n] = (pos + self.HEADER.size, length, flags)
+                    live += self.HEADER.size + length
+                    pos += self.HEADER.size + length
+                data_end = pos
+                if size > data_end:
+                    os.ftruncate(fd, data_end)
+
+        self.block_maps[filename] = block_map
+        self.data_ends[filename] = data_end
+        self.garbage[filename] = data_end - live
+
+    def _write_block_map(self, filename):
+        """
+        Writes the block map and footer after the last record of the file.
+
+        :param filename: The file name
+        """
+        block_map = self.block_maps[filename]
+        map_offset = self.data_ends[filename]
+        blocks = self.length(filename)
+        trailer = b''.join(self.MAP_ENTRY.pack(n, *entry) for n, entry in sorted(block_map.items()))
+        trailer += self.FOOTER.pack(map_offset, len(block_map), blocks, self.MAGIC)
+        with self.file_handles.open(filename) as fd:
+            os.pwrite(fd, trailer, map_offset)
+            os.ftruncate(fd, map_offset + len(trailer))
+        self.sealed.add(filename)
+
+    def _unseal(self, filename):
+        """
+        Removes the block map from the end of the file before new records
+        are appended, so that a crash leaves a file that can be scanned.
+
+        :param filename: The file name
+        """
+        with self.file_handles.open(filename) as fd:
+            os.ftruncate(fd, self.data_ends[filename])
+        self.sealed.discard(filename)
@@ -0,0 +1,96 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from .block_id import BlockId
+from .codec import ZlibCodec
+from .compressed_file_manager import CompressedFileManager
+from .file_manager import FileManager
+from .page import Page, RecordFormat
+
+LAYOUT = RecordFormat([(RecordFormat.INTEGER, 0), (RecordFormat.VARCHAR, 20), (RecordFormat.INTEGER, 0)])
+
+
+def fill(page, rng, first_id):
+    """
+    Fills a page with records shaped like those of a table of
+    (id int, name varchar(20), amount int), leaving the tail of the page empty.
+
+    :param page: the Page to fill
+    :param rng: a random.Random
+    :param first_id: the id of the page's first record
+    """
+    slot = 4 + LAYOUT.size()  # a used/empty flag, then the record
+    for i in range(len(page.contents()) // slot):
+        if rng.random() < 0.2:
+            continue  # an empty slot
+        page.set_int(i * slot, 1)
+        page.pack_record(LAYOUT, i * slot + 4, [first_id + i, f"customer-{rng.randrange(1000)}", rng.randrange(10000)])
+
+
+def run(file_manager, filename, blocks, block_size, seed):
+    """
+    Writes `blocks` record pages in one bulk write, then scans them back one block at a time.
+
+    :param file_manager: a FileManager or CompressedFileManager
+    :param filename: the file to write
+    :param blocks: the number of blocks
+    :param block_size: the block size
+    :param seed: the seed of the record contents
+    :return: dict with the file size, the bytes read from disk and the scan throughput
+    """
+    rng = random.Random(seed)
+    pages = []
+    for n in range(blocks):
+        page = Page(block_size)
+        fill(page, rng, n * 100)
+        pages.append(page)
+    file_manager.write_blocks([BlockId.of(filename, n) for n in range(blocks)], pages)
+    file_manager.sync(filename)
+
+    blocks_read = file_manager.blocks_read
+    stored = getattr(file_manager, "stored_bytes_read", 0)
+    page = Page(block_size)
+    began = time.perf_counter()
+    for n in range(blocks):
+        file_manager.read_block(BlockId.of(filename, n), page)
+    elapsed = time.perf_counter() - began
+
+    if isinstance(file_manager, CompressedFileManager):
+        bytes_read = file_manager.stored_bytes_read - stored
+    else:
+        bytes_read = (file_manager.blocks_read - blocks_read) * block_size
+    return {
+        "file_bytes": os.path.getsize(file_manager.db_directory / filename),
+        "bytes_read": bytes_read,
+        "blocks_per_second": blocks / elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compares the size and scan speed of raw and compressed data files.")
+    parser.add_argument("--blocks", type=int, default=5000, help="number of blocks written and scanned")
+    parser.add_argument("--block-size", type=int, default=4096)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6], help="zlib levels to compare with raw files")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as dirname:
+        managers = [("raw", FileManager(os.path.join(dirname, "raw"), args.block_size))]
+        managers += [(f"zlib-{level}", CompressedFileManager(os.path.join(dirname, f"zlib-{level}"), args.block_size,
+                                                             ZlibCodec(level)))
+                     for level in args.levels]
+
+        print(f"{args.blocks} blocks of {args.block_size} bytes, scanned with a warm OS page cache")
+        print(f"{'mode':<8}{'file MB':>10}{'read MB':>10}{'blocks/s':>12}{'MB/s':>10}")
+        for name, file_manager in managers:
+            result = run(file_manager, "bench", args.blocks, args.block_size, seed=1)
+            rate = result["blocks_per_second"]
+            print(f"{name:<8}{result['file_bytes'] / 1e6:>10.2f}{result['bytes_read'] / 1e6:>10.2f}"
+                  f"{rate:>12,.0f}{rate * args.block_size / 1e6:>10.1f}")
+            file_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class FileHandlePool:
+    """
+    A bounded pool of raw OS file descriptors, shared by every caller
+    of the file manager.
+
+    Descriptors stay open between calls and are reference counted while in use.
+    When more than `max_open` files are open, the least recently used
+    descriptors that nobody is using are closed. If every descriptor is in use,
+    the pool temporarily exceeds its bound instead of blocking.
+    A descriptor discarded while in use is retired: the next `acquire` opens
+    the file again, and the old descriptor is closed by its last `release`.
+    """
+    MAX_OPEN = 256
+
+    def __init__(self, directory, max_open=MAX_OPEN):
+        """
+        Creates an empty pool.
+
+        :param directory: Path to the directory holding the files
+        :param max_open: Number of descriptors kept open at most
+        """
+        self.directory = Path(directory)
+        self.max_open = max_open
+        self.handles = OrderedDict()  # filename -> [fd, reference count], least recently used first
+        self.retired = {}  # fd -> reference count of a descriptor discarded while in use
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.opens = 0
+        self.closes = 0
+
+    def acquire(self, filename, flags=0):
+        """
+        Returns a descriptor for the file, opening (and creating) it if needed.
+        Every call must be matched by a call to `release` with the descriptor.
+
+        :param filename: The file name
+        :param flags: Extra os.open flags, used when the file has to be opened
+        :return: The file descriptor
+        """
+        with self.lock:
+            handle = self.handles.get(filename)
+            if handle is not None:
+                self.hits += 1
+                self.handles.move_to_end(filename)
+            else:
+                self._evict(self.max_open - 1)
+                fd = os.open(self.directory / filename, os.O_RDWR | os.O_CREAT | flags, 0o644)
+                self.opens += 1
+                handle = self.handles[filename] = [fd, 0]
+            handle[1] += 1
+            return handle[0]
+
+    def release(self, filename, fd):
+        """
+        Marks one use of the file's descriptor as finished.
+        The descriptor stays open until it is evicted, unless it was retired.
+
+        :param filename: The file name
+        :param fd: The descriptor returned by `acquire`
+        """
+        with self.lock:
+            handle = self.handles.get(filename)
+            if handle is not None and handle[0] == fd:
+                handle[1] -= 1
+                return
+            self.retired[fd] -= 1
+            if self.retired[fd] == 0:
+                del self.retired[fd]
+                os.close(fd)
+                self.closes += 1
+
+    @contextmanager
+    def open(self, filename, flags=0):
+        """
+        Acquires the file's descriptor for the duration of a `with` block.
+
+        :param filename: The file name
+        :param flags: Extra os.open flags, used when the file has to be opened
+        """
+        fd = self.acquire(filename, flags)
+        try:
+            yield fd
+        finally:
+            self.release(filename, fd)
+
+    def discard(self, filename):
+        """
+        Closes the file's descriptor, e.g. before the file is replaced on disk
+        or reopened with other flags. A descriptor still in use is retired
+        instead, so that the next `acquire` opens the file again.
+
+        :param filename: The file name
+        """
+        with self.lock:
+            handle = self.handles.pop(filename, None)
+            if handle is None:
+                return
+            if handle[1] > 0:
+                self.retired[handle[0]] = handle[1]
+            else:
+                os.close(handle[0])
+                self.closes += 1
+
+    def close_all(self):
+        """
+        Closes every descriptor in the pool.
+        """
+        with self.lock:
+            for fd in [fd for fd, _ in self.handles.values()] + list(self.retired):
+                os.close(fd)
+                self.closes += 1
+            self.handles.clear()
+            self.retired.clear()
+
+    def stats(self):
+        """
+        Returns the pool's open/close churn counters.
+
+        :return: dict of counter name to value
+        """
+        return {
+            "open": len(self.handles),
+            "hits": self.hits,
+            "opens": self.opens,
+            "closes": self.closes,
+        }
+
+    def _evict(self, limit):
+        """
+        Closes unused descriptors, least recently used first,
+        until at most `limit` remain open or none are unused.
+
+        :param limit: The number of descriptors to keep
+        """
+        if len(self.handles) <= limit:
+            return
+        for filename in [name for name, (_, refs) in self.handles.items() if refs == 0]:
+            fd, _ = self.handles.pop(filename)
+            os.close(fd)
+            self.closes += 1
+            if len(self.handles) <= limit:
+                return
@@ -1,31 +1,75 @@
+import errno
+import mmap
 import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 from .block_id import BlockId
+from .file_handle_pool import FileHandlePool
+from .latency_histogram import LatencyHistogram
+from .page import Page
 
 
 class FileManager:
-    def __init__(self, db_directory, block_size):
+    IOV_MAX = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in getattr(os, "sysconf_names", {}) else 1024
+    
+    EXTENT_SIZE = 1024 * 1024  # bytes preallocated each time a file runs out of space
+    FILE_LENGTHS = "file_lengths"  # block counts recorded by `sync` and `close`, which a crash cannot shorten
+    DIRECT_IO_ALIGNMENT = mmap.PAGESIZE  # O_DIRECT buffers, offsets and sizes must be multiples of this
+    
+    def __init__(self, db_directory, block_size, extent_size=EXTENT_SIZE, max_open_files=FileHandlePool.MAX_OPEN,
+                 direct_io=False, buffered=()):
         """
         Initializes the File Manager.
         
         :param db_directory: Path to the database directory
         :param block_size: The size of a single block in bytes
+        :param extent_size: Number of bytes a file grows by when an append needs space,
+                            rounded up to a whole number of blocks
+        :param max_open_files: Number of file descriptors kept open at most
+        :param direct_io: Bypass the OS page cache (O_DIRECT) for data files, so that
+                          the buffer pool is the only cache. Ignored where the platform
+                          does not support it or the block size is not aligned.
+        :param buffered: File name prefixes of the files that always use the page cache, e.g. the log
         """
         
         self.db_directory = Path(db_directory)
-        self.block_size = block_size
-        self.is_new = not self.db_directory.exists()
-        self.open_files = {}
+        self._block_size = block_size
+        self._extent_size = -(-extent_size // block_size) * block_size
+        self._is_new = not self.db_directory.exists()
+        self.file_handles = FileHandlePool(self.db_directory, max_open_files)
+        self.direct_io = (direct_io and hasattr(os, "O_DIRECT")
+                          and block_size % self.DIRECT_IO_ALIGNMENT == 0)
+        self.buffered = tuple(buffered)
+        self.direct_io_refused = set()  # files whose filesystem rejected O_DIRECT
+        self.block_counts = {}  # filename -> logical number of blocks
+        self.allocated = {}  # filename -> bytes allocated on disk
+        self.durable_lengths = {}  # filename -> number of blocks recorded in FILE_LENGTHS
+        self.tail_written = {}  # filename -> block count when its last block was written with data
+        self._zero_block = bytes(block_size)
+        self.lengths_lock = threading.Lock()  # serializes updates of FILE_LENGTHS
+        
+        # I/O counters; latencies are per call
+        self.blocks_read = 0
+        self.blocks_written = 0
+        self.read_calls = 0
+        self.write_calls = 0
+        self.read_latency = LatencyHistogram()
+        self.write_latency = LatencyHistogram()
+        self.sync_latency = LatencyHistogram()
         
         # Create directory if new
-        if self.is_new:
+        if self._is_new:
             self.db_directory.mkdir(parents=True, exist_ok=True)
         
         # Remove leftover temporary files
         for file in self.db_directory.iterdir():
            if file.name.startswith("temp"):
                file.unlink()
+        
+        self._load_lengths()
                
     
     def read_block(self, block, page):
@@ -36,12 +80,14 @@ class FileManager:
         :param page: Page object to store the read data
         """
         
+        began = time.perf_counter()
         try:
-            with self._get_file(block.file_name()) as f:
-                f.seek(block.number * self.block_size)
-                page.contents[:] = f.read(self.block_size)  # Read into the page buffer
+            n = self._io(block.file_name(), self._read_into, page.contents(), block.number() * self._block_size)
+            if n < self._block_size:  # Blocks past the end of the file read as zeros
+                page.contents()[n:] = bytes(self._block_size - n)
         except Exception as e:
             raise RuntimeError(f"Error reading block {block} from disk: {e}")
+        self._count_read(1, began)
     
     
     def write(self, block, page):
@@ -52,33 +98,155 @@ class FileManager:
         :param page: Page object containing the data to write
         """
         
+        began = time.perf_counter()
         try:
-            with self._get_file(block.file_name()) as f:
-                f.seek(block.number * self.block_size)
-                f.write(page.contents)
+            self._io(block.file_name(), os.pwrite, page.contents(), block.number() * self._block_size)
         except Exception as e:
             raise RuntimeError(f"Error writing block {block} to disk: {e}")
+        self._note_written(block.file_name(), block.number(), [page])
+        self._count_write(1, began)
+        
+    
+    def read_blocks(self, blocks, pages):
+        """
+        Reads several blocks from disk, one page per block.
+        Runs of contiguous blocks of the same file are read
+        with a single positional vectored read.
+        
+        :param blocks: list of BlockId objects to read
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        
+        if not hasattr(os, "preadv"):
+            for block, page in zip(blocks, pages):
+                self.read_block(block, page)
+            return
+        
+        for filename, first, run in self._contiguous_runs(blocks, pages):
+            began = time.perf_counter()
+            try:
+                buffers = [page.contents() for page in run]
+                n = self._io(filename, os.preadv, buffers, first * self._block_size)
+            except Exception as e:
+                raise RuntimeError(f"Error reading blocks {first}-{first + len(run) - 1} of {filename} from disk: {e}")
+            
+            # Blocks past the end of the file read as zeros
+            for i, page in enumerate(run):
+                start = max(n - i * self._block_size, 0)
+                if start < self._block_size:
+                    page.contents()[start:] = bytes(self._block_size - start)
+            self._count_read(len(run), began)
+    
+    
+    def write_blocks(self, blocks, pages):
+        """
+        Writes several pages to disk, one page per block.
+        Runs of contiguous blocks of the same file are written
+        with a single positional vectored write.
+        
+        :param blocks: list of BlockId objects to write
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        
+        if not hasattr(os, "pwritev"):
+            for block, page in zip(blocks, pages):
+                self.write(block, page)
+            return
         
+        for filename, first, run in self._contiguous_runs(blocks, pages):
+            began = time.perf_counter()
+            try:
+                self._io(filename, os.pwritev, [page.contents() for page in run], first * self._block_size)
+            except Exception as e:
+                raise RuntimeError(f"Error writing blocks {first}-{first + len(run) - 1} of {filename} to disk: {e}")
+            self._note_written(filename, first, run)
+            self._count_write(len(run), began)
+    
+    
+    def sync(self, filename):
+        """
+        Forces the file's written blocks to stable storage.
+        If the file has grown since it was last synced, its number of blocks
+        is recorded too, so that a crash cannot shorten it; unless its last
+        block holds data, which is how `_load_length` finds the end anyway.
+        
+        :param filename: Name of the file to sync
+        """
+        
+        began = time.perf_counter()
+        try:
+            count = self.block_counts.get(filename)
+            tail_written = self.tail_written.get(filename)
+            with self._open(filename) as fd:
+                os.fsync(fd)
+            if count is not None and count > self.durable_lengths.get(filename, 0) and tail_written != count:
+                self._record_lengths({filename: count})
+        except Exception as e:
+            raise RuntimeError(f"Error syncing file {filename} to disk: {e}")
+        self.sync_latency.record(time.perf_counter() - began)
+    
     
     def append(self, filename):
         """
         Appends a new empty block to the file.
+        The block count is kept in memory; the file itself grows one
+        extent at a time, so most appends do not touch the disk.
         
         :param filename: Name of the file to append to
         :return: BlockId of the newly added block
         """
         new_block_num = self.length(filename)
-        block = BlockId(filename, new_block_num)
-        empty_block = bytearray(self.block_size)
+        block = BlockId.of(filename, new_block_num)
+        end = (new_block_num + 1) * self._block_size
+        
+        if end > self.allocated[filename]:
+            try:
+                self._allocate_extent(filename, end)
+            except Exception as e:
+                raise RuntimeError(f"Error appending block to file {filename}: {e}")
+        
+        self.block_counts[filename] = new_block_num + 1
+        return block
+    
+    def preallocate(self, filename, size):
+        """
+        Makes sure at least `size` bytes are allocated to the file, e.g. to
+        create a file ahead of time so that later appends do not grow it.
         
+        :param filename: Name of the file
+        :param size: Number of bytes to allocate, rounded up to whole blocks
+        """
+        self.length(filename)
+        start = self.allocated[filename]
+        size = -(-size // self._block_size) * self._block_size
+        if size <= start:
+            return
         try:
-            with self._get_file(filename) as f:
-                f.seek(block.number * self.block_size)
-                f.write(empty_block)
+            with self._open(filename) as fd:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(fd, start, size - start)
+                else:
+                    os.ftruncate(fd, size)
         except Exception as e:
-            raise RuntimeError(f"Error appending block to file {filename}: {e}")
+            raise RuntimeError(f"Error preallocating file {filename}: {e}")
+        self.allocated[filename] = size
+    
+    def delete(self, filename):
+        """
+        Removes a file that is no longer needed, e.g. an old log segment.
         
-        return block
+        :param filename: Name of the file
+        """
+        self.block_counts.pop(filename, None)
+        self.allocated.pop(filename, None)
+        self.tail_written.pop(filename, None)
+        self.file_handles.discard(filename)
+        try:
+            if filename in self.durable_lengths:
+                self._record_lengths({filename: None})  # a new file of the same name starts empty
+            (self.db_directory / filename).unlink(missing_ok=True)
+        except Exception as e:
+            raise RuntimeError(f"Error deleting file {filename}: {e}")
     
     def length(self, filename):
         """
@@ -88,37 +256,354 @@ class FileManager:
         :return: Number of blocks in the file
         """
         
-        try:
-            with self._get_file(filename) as f:
-                return f.seek(0, os.SEEK_END) // self.block_size
-        except Exception as e:
-            raise RuntimeError(f"Error getting length of file {filename}: {e}")
+        if filename not in self.block_counts:
+            try:
+                self._load_length(filename)
+            except Exception as e:
+                raise RuntimeError(f"Error getting length of file {filename}: {e}")
+        return self.block_counts[filename]
         
     
     def is_new(self):
         """
         Returns whether this is a new database.
         """
-        return self.is_new
+        return self._is_new
 
     def block_size(self):
         """
         Returns the block size.
         """
-        return self.block_size
+        return self._block_size
+
+    def extent_size(self):
+        """
+        Returns the number of bytes a file grows by when an append needs space.
+        """
+        return self._extent_size
     
-    def _get_file(self, filename):
+    def new_page(self):
+        """
+        Allocates a block-sized page suitable for this manager's I/O.
+        With direct I/O the page is backed by anonymous mmap memory,
+        which is aligned to the OS page size.
+        
+        :return: A new zeroed Page
+        """
+        return Page(byte_array=self._new_buffer(self._block_size))
+
+    def uses_direct_io(self, filename):
         """
-        Opens or retrieves a file handle for the given filename.
+        Returns whether the file is accessed with O_DIRECT.
         
         :param filename: The file name
-        :return: File handle
         """
-        file_path = self.db_directory / filename
-        if filename not in self.open_files:
-            self.open_files[filename] = open(file_path, "r+b" if file_path.exists() else "w+b")
-       
-        return self.open_files[filename]
+        return (self.direct_io and not filename.startswith(self.buffered)
+                and filename not in self.direct_io_refused)
 
+    def _new_buffer(self, size):
+        """
+        Allocates a zeroed buffer, aligned for direct I/O if it is enabled.
+        
+        :param size: The size of the buffer in bytes
+        :return: A writable buffer
+        """
+        if self.direct_io and size > 0:
+            return mmap.mmap(-1, size)
+        return bytearray(size)
+
+    @contextmanager
+    def _open(self, filename):
+        """
+        Acquires the file's descriptor for a `with` block,
+        opening it with O_DIRECT when the file uses direct I/O.
+        If the filesystem refuses O_DIRECT, the file is opened through the page cache.
+        
+        :param filename: The file name
+        """
+        flags = os.O_DIRECT if self.uses_direct_io(filename) else 0
+        try:
+            fd = self.file_handles.acquire(filename, flags)
+        except OSError as e:
+            if not flags or e.errno != errno.EINVAL:
+                raise
+            self.direct_io_refused.add(filename)
+            fd = self.file_handles.acquire(filename)
+        
+        try:
+            yield fd
+        finally:
+            self.file_handles.release(filename, fd)
+
+    def _io(self, filename, io, buffers, offset):
+        """
+        Runs a positional I/O call, io(fd, buffers, offset), on the file's descriptor.
+        With direct I/O, a call rejected with EINVAL, e.g. because a caller's
+        buffer is not aligned, is retried through aligned bounce buffers.
+        Only if that is rejected too does the file fall back to the page cache for good.
+        
+        :param filename: The file name
+        :param io: The I/O function, e.g. os.pwrite or os.preadv
+        :param buffers: The buffer, or for vectored calls the list of buffers
+        :param offset: The byte position in the file
+        :return: The result of the I/O function
+        """
+        try:
+            with self._open(filename) as fd:
+                return io(fd, buffers, offset)
+        except OSError as e:
+            if e.errno != errno.EINVAL or not self.uses_direct_io(filename):
+                raise
+        
+        try:
+            with self._open(filename) as fd:
+                return self._bounced_io(fd, io, buffers, offset)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+        
+        self.direct_io_refused.add(filename)
+        self.file_handles.discard(filename)  # retired if another thread holds it; it is not reused
+        with self._open(filename) as fd:
+            return io(fd, buffers, offset)
+
+    def _bounced_io(self, fd, io, buffers, offset):
+        """
+        Runs a positional I/O call through aligned copies of the buffers.
+        
+        :param fd: The file descriptor
+        :param io: The I/O function
+        :param buffers: The buffer, or for vectored calls the list of buffers
+        :param offset: The byte position in the file
+        :return: The result of the I/O function
+        """
+        vectored = isinstance(buffers, list)
+        originals = buffers if vectored else [buffers]
+        reading = io in (self._read_into, os.preadv)
+        bounce = [mmap.mmap(-1, len(buffer)) for buffer in originals]  # anonymous mappings are page aligned
+        try:
+            if not reading:
+                for copy, buffer in zip(bounce, originals):
+                    copy[:] = buffer
+            result = io(fd, bounce if vectored else bounce[0], offset)
+            if reading:
+                for copy, buffer in zip(bounce, originals):
+                    memoryview(buffer)[:] = copy
+            return result
+        finally:
+            for copy in bounce:
+                copy.close()
+
+    def _read_into(self, fd, buffer, offset):
+        """
+        Fills a buffer with file data starting at `offset`, without
+        going through an intermediate bytes object where the platform allows.
+        
+        :param fd: The file descriptor
+        :param buffer: The writable buffer to fill
+        :param offset: The byte position in the file
+        :return: The number of bytes read
+        """
+        if hasattr(os, "preadv"):
+            return os.preadv(fd, [buffer], offset)
+        data = os.pread(fd, len(buffer), offset)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def file_stats(self):
+        """
+        Returns the open/close churn counters of the file descriptor pool.
+        """
+        return self.file_handles.stats()
+
+    def io_stats(self):
+        """
+        Returns the block I/O counters and the latency histograms
+        of read, write and sync calls; times are in seconds.
+        """
+        return {
+            "blocks_read": self.blocks_read,
+            "blocks_written": self.blocks_written,
+            "read_calls": self.read_calls,
+            "write_calls": self.write_calls,
+            "read_latency": self.read_latency.snapshot(),
+            "write_latency": self.write_latency.snapshot(),
+            "sync_latency": self.sync_latency.snapshot(),
+        }
+
+    def _count_read(self, blocks, start):
+        """
+        Counts a read call.
+
+        :param blocks: the number of blocks it read
+        :param start: its start time, from time.perf_counter()
+        """
+        self.read_latency.record(time.perf_counter() - start)
+        self.read_calls += 1
+        self.blocks_read += blocks
+
+    def _count_write(self, blocks, start):
+        """
+        Counts a write call.
+
+        :param blocks: the number of blocks it wrote
+        :param start: its start time, from time.perf_counter()
+        """
+        self.write_latency.record(time.perf_counter() - start)
+        self.write_calls += 1
+        self.blocks_written += blocks
+
+    def _note_written(self, filename, first, pages):
+        """
+        Notes whether a write of consecutive blocks left data in the file's last block.
+
+        :param filename: the file name
+        :param first: the number of the first block written
+        :param pages: the pages written, in block order
+        """
+        count = self.block_counts.get(filename)
+        if count is not None and first < count <= first + len(pages):
+            if bytes(pages[count - 1 - first].contents()) != self._zero_block:
+                self.tail_written[filename] = count
+            else:
+                self.tail_written.pop(filename, None)
+
+    def _contiguous_runs(self, blocks, pages):
+        """
+        Groups blocks into runs of consecutive block numbers within one file,
+        each small enough for a single vectored I/O call.
+        
+        :param blocks: list of BlockId objects
+        :param pages: list of Page objects, parallel to `blocks`
+        :return: generator of (filename, first block number, pages of the run)
+        """
+        order = sorted(range(len(blocks)), key=lambda i: (blocks[i].file_name(), blocks[i].number()))
+        run = []
+        for i in order:
+            block = blocks[i]
+            if run and (block.file_name() != filename
+                        or block.number() != first + len(run)
+                        or len(run) == self.IOV_MAX):
+                yield filename, first, run
+                run = []
+            if not run:
+                filename, first = block.file_name(), block.number()
+            run.append(pages[i])
+        if run:
+            yield filename, first, run
+
+    def _load_length(self, filename):
+        """
+        Initializes the cached block count and allocated size of a file.
+        The file holds at least the blocks recorded when it was last synced
+        or closed. Beyond those, its size may include space preallocated before
+        a crash, so only blocks up to the last one holding data are counted;
+        a file that `close` trimmed has none to spare.
+        
+        :param filename: The file name
+        """
+        with self._open(filename) as fd:
+            size = os.fstat(fd).st_size
+        blocks = size // self._block_size
+        recorded = self.durable_lengths.get(filename, 0)
+        self.block_counts[filename] = max(recorded, self._last_used_block(filename, recorded, blocks))
+        self.allocated[filename] = size
+    
+    def _last_used_block(self, filename, start, end):
+        """
+        Finds the end of the data among blocks `start` to `end` of a file,
+        reading backwards one extent at a time, so that only the zero
+        blocks at the end and the extent holding the last data are read.
+        
+        :param filename: The file name
+        :param start: The first block that may be preallocated space
+        :param end: The number of blocks the file's size covers
+        :return: The number of the block after the last one holding data, at least `start`
+        """
+        extent = self._extent_size // self._block_size
+        while end > start:
+            first = max(start, end - extent)
+            chunk = self._new_buffer((end - first) * self._block_size)
+            self._io(filename, self._read_into, chunk, first * self._block_size)
+            used = len(bytes(chunk).rstrip(b"\0"))
+            if used:
+                return first + -(-used // self._block_size)
+            end = first
+        return start
+    
+    def _load_lengths(self):
+        """
+        Reads the block counts recorded by earlier syncs and closes.
+        """
+        path = self.db_directory / self.FILE_LENGTHS
+        if not path.exists():
+            return
+        for line in path.read_text().splitlines():
+            filename, count = line.rsplit(" ", 1)
+            self.durable_lengths[filename] = int(count)
     
+    def _record_lengths(self, counts):
+        """
+        Records block counts of files, replacing the list of lengths atomically.
+        
+        :param counts: dict of filename to number of blocks, or None to forget a deleted file
+        """
+        with self.lengths_lock:
+            for filename, count in counts.items():
+                if count is None:
+                    self.durable_lengths.pop(filename, None)
+                else:
+                    self.durable_lengths[filename] = max(count, self.durable_lengths.get(filename, 0))
+            path = self.db_directory / self.FILE_LENGTHS
+            tmp_path = path.with_name(path.name + ".new")
+            with open(tmp_path, "w") as f:
+                f.write("".join(f"{name} {count}\n" for name, count in sorted(self.durable_lengths.items())))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self.sync_directory()
+    
+    def sync_directory(self):
+        """
+        Forces the database directory's entries, e.g. a removed or renamed file, to stable storage.
+        """
+        fd = os.open(self.db_directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _allocate_extent(self, filename, end):
+        """
+        Grows the file by whole extents until it is at least `end` bytes long.
+        
+        :param filename: The file name
+        :param end: The number of bytes the file must hold
+        """
+        start = self.allocated[filename]
+        size = start + -(-(end - start) // self._extent_size) * self._extent_size
+        
+        with self._open(filename) as fd:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, start, size - start)
+            else:
+                os.ftruncate(fd, size)
+        self.allocated[filename] = size
+
+    def close(self):
+        """
+        Trims the preallocated space beyond the last block of each file,
+        records each file's number of blocks, so that reopening it does not
+        have to tell trailing zero blocks from preallocated space,
+        and closes every file descriptor opened by this manager.
+        """
+        for filename, count in self.block_counts.items():
+            with self._open(filename) as fd:
+                os.ftruncate(fd, count * self._block_size)
+                os.fsync(fd)
+        self._record_lengths(dict(self.block_counts))
+        self.file_handles.close_all()
+        self.block_counts.clear()
+        self.allocated.clear()
+        self.tail_written.clear()
     
\ No newline at end of file
@@ -0,0 +1,79 @@
+class LatencyHistogram:
+    """
+    Counts latencies in power-of-two buckets of microseconds: bucket i holds
+    the latencies from 2**(i-1) up to 2**i microseconds, bucket 0 those under one.
+
+    Recording takes a few integer operations and no lock, so histograms can
+    stay on in production. Callers that record from several threads without
+    holding a latch of their own may lose an occasional count.
+    """
+    BUCKETS = 64  # enough for any latency, so recording needs no bounds check
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """
+        Records a latency.
+
+        :param seconds: the latency in seconds
+        """
+        self.counts[int(seconds * 1_000_000).bit_length()] += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def count(self):
+        """
+        :return: the number of latencies recorded
+        """
+        return sum(self.counts)
+
+    def percentile(self, p):
+        """
+        Returns an upper bound of a percentile: the upper end of the bucket holding it.
+
+        :param p: the percentile, between 0 and 100
+        :return: the bound in seconds, or 0.0 if nothing was recorded
+        """
+        rank = p / 100 * self.count()
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** i / 1_000_000, self.max)
+        return 0.0
+
+    def snapshot(self):
+        """
+        Returns the histogram's summary; times are in seconds.
+
+        :return: dict with the count, mean, max, p50 and p99 latencies, and the
+                 non-empty buckets keyed by their upper bound in microseconds
+        """
+        count = self.count()
+        return {
+            "count": count,
+            "mean": self.total / count if count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": {2 ** i: n for i, n in enumerate(self.counts) if n},
+        }
+
+    @classmethod
+    def merged(cls, histograms):
+        """
+        Adds several histograms up, e.g. those of the shards of a buffer pool.
+
+        :param histograms: the histograms
+        :return: a new histogram holding all their latencies
+        """
+        result = cls()
+        for histogram in histograms:
+            result.counts = [a + b for a, b in zip(result.counts, histogram.counts)]
+            result.total += histogram.total
+            result.max = max(result.max, histogram.max)
+        return result
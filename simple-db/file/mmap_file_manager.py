@@ -0,0 +1,172 @@
+import mmap
+import os
+import threading
+import time
+
+from .file_handle_pool import FileHandlePool
+from .file_manager import FileManager
+
+
+class MmapFileManager(FileManager):
+    """
+    A FileManager that serves blocks out of memory-mapped data files.
+
+    Each file is mapped once and block reads and writes become a single
+    memory copy between the mapping and the page, instead of a seek
+    followed by a read or write system call per block.
+    A file is mapped whole, preallocated extents included, so its mapping
+    is only recreated when `append` grows the file by another extent.
+
+    As with FileManager, blocks past the end of a file read as zeros, and
+    writing one extends the file. The log writer, read-ahead and background
+    writer threads share the mappings, so copies and remappings happen
+    under `map_lock`; no view of a mapping outlives it.
+    """
+
+    def __init__(self, db_directory, block_size, extent_size=FileManager.EXTENT_SIZE,
+                 max_open_files=FileHandlePool.MAX_OPEN):
+        """
+        Initializes the memory-mapped File Manager.
+        
+        :param db_directory: Path to the database directory
+        :param block_size: The size of a single block in bytes
+        :param extent_size: Number of bytes a file grows by when an append needs space
+        :param max_open_files: Number of file descriptors kept open at most
+        """
+        super().__init__(db_directory, block_size, extent_size, max_open_files)
+        self.maps = {}
+        self.map_lock = threading.Lock()  # guards the mappings
+
+    def read_block(self, block, page):
+        """
+        Copies a block from the file mapping into the page.
+        
+        :param block: BlockId object representing the block to read
+        :param page: Page object to store the read data
+        """
+        began = time.perf_counter()
+        try:
+            start = block.number() * self._block_size
+            contents = page.contents()
+            with self.map_lock:
+                mm = self._get_map(block.file_name(), start + self._block_size)
+                n = 0
+                if mm is not None:
+                    n = min(max(len(mm) - start, 0), self._block_size)
+                    with memoryview(mm) as view:
+                        contents[:n] = view[start:start + n]
+            if n < self._block_size:  # Blocks past the end of the file read as zeros
+                contents[n:] = bytes(self._block_size - n)
+        except Exception as e:
+            raise RuntimeError(f"Error reading block {block} from disk: {e}")
+        self._count_read(1, began)
+
+    def write(self, block, page):
+        """
+        Copies a page into the file mapping of the block.
+        
+        :param block: BlockId object representing the block to write
+        :param page: Page object containing the data to write
+        """
+        began = time.perf_counter()
+        try:
+            start = block.number() * self._block_size
+            with self.map_lock:
+                mm = self._get_map(block.file_name(), start + self._block_size, grow=True)
+                with memoryview(mm) as view:
+                    view[start:start + self._block_size] = page.contents()
+        except Exception as e:
+            raise RuntimeError(f"Error writing block {block} to disk: {e}")
+        self._note_written(block.file_name(), block.number(), [page])
+        self._count_write(1, began)
+
+    def read_blocks(self, blocks, pages):
+        """
+        Copies several blocks from their file mappings, one page per block.
+        
+        :param blocks: list of BlockId objects to read
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        for block, page in zip(blocks, pages):
+            self.read_block(block, page)
+
+    def write_blocks(self, blocks, pages):
+        """
+        Copies several pages into their file mappings, one page per block.
+        
+        :param blocks: list of BlockId objects to write
+        :param pages: list of Page objects, parallel to `blocks`
+        """
+        for block, page in zip(blocks, pages):
+            self.write(block, page)
+
+    def sync(self, filename):
+        """
+        Flushes the file's mapping, then forces the file to stable storage.
+        
+        :param filename: Name of the file to sync
+        """
+        with self.map_lock:
+            mm = self.maps.get(filename)
+            if mm is not None:
+                mm.flush()
+        super().sync(filename)
+
+    def delete(self, filename):
+        """
+        Unmaps the file, then removes it.
+        
+        :param filename: Name of the file
+        """
+        with self.map_lock:
+            self._unmap(filename)
+        super().delete(filename)
+
+    def close(self):
+        """
+        Unmaps every mapped file, then trims and closes the underlying files.
+        """
+        with self.map_lock:
+            for filename in list(self.maps):
+                self._unmap(filename)
+        super().close()
+
+    def _get_map(self, filename, min_size, grow=False):
+        """
+        Returns the mapping of the file, mapping it (again) if it is not
+        mapped yet or is smaller than `min_size`. The caller holds `map_lock`.
+        
+        :param filename: The file name
+        :param min_size: The number of bytes the mapping should cover
+        :param grow: Extend the file to `min_size` bytes if it is shorter;
+                     otherwise a shorter file is mapped as it is
+        :return: the mmap object, or None if the file is empty and not grown
+        """
+        mm = self.maps.get(filename)
+        if mm is not None and len(mm) >= min_size:
+            return mm
+        with self.file_handles.open(filename) as fd:
+            size = os.fstat(fd).st_size
+            if mm is not None and len(mm) == size and not grow:
+                return mm  # the file has not grown since it was mapped
+            if size < min_size and grow:
+                os.ftruncate(fd, min_size)
+                size = min_size
+                if filename in self.allocated:
+                    self.allocated[filename] = max(self.allocated[filename], size)
+            self._unmap(filename)
+            if size == 0:
+                return None
+            mm = mmap.mmap(fd, 0)  # the mapping keeps its own reference to the file
+        self.maps[filename] = mm
+        return mm
+
+    def _unmap(self, filename):
+        """
+        Removes the mapping of the file, if there is one.
+        
+        :param filename: The file name
+        """
+        mm = self.maps.pop(filename, None)
+        if mm is not None:
+            mm.close()
@@ -2,19 +2,29 @@ import struct
 
 
 class Page:
+    """
+    A block-sized region of memory with typed accessors.
+    The page is a memoryview, so it can wrap any buffer (a bytearray,
+    an mmap slice, shared memory) without copying it.
+    """
     CHARSET = 'ascii'
+    BYTES_PER_CHAR = len('a'.encode(CHARSET))  # 1 byte per character for ASCII
+    INT = struct.Struct('>i')  # precompiled codec for the 4-byte big-endian ints
+    
     def __init__(self, block_size=None, byte_array=None):
         """
         Constructor to initialize a Page instance.
+        A buffer passed as the first argument is wrapped, like `byte_array`.
         
         :param block_size: The size of the page if creating a new buffer.
-        :param byte_array: A byte array for wrapping the page data (used in logging).
+        :param byte_array: A buffer for wrapping the page data (used in logging).
         """
         
-        if block_size: 
-            self.bb  = bytearray(block_size)
-        elif byte_array:
-            self.bb = byte_array
+        if isinstance(block_size, int): 
+            self.bb = memoryview(bytearray(block_size))
+        elif block_size is not None or byte_array is not None:
+            buffer = block_size if block_size is not None else byte_array
+            self.bb = memoryview(buffer).cast('B')
         else:
             raise ValueError("Must provide either block_size or byte_array")
          
@@ -25,7 +35,7 @@ class Page:
         :param offset: The position from which to read the integer.
         :return: The integer value.
         """
-        return struct.unpack_from('>i', self.bb, offset)[0]
+        return self.INT.unpack_from(self.bb, offset)[0]
 
     def set_int(self, offset, n):
         """
@@ -34,14 +44,55 @@ class Page:
         :param offset: The position to write the integer.
         :param n: The integer value to store.
         """
-        struct.pack_into('>i', self.bb, offset, n)
+        self.INT.pack_into(self.bb, offset, n)
+    
+    def get_ints(self, offsets):
+        """
+        Gets the integer values at each of the specified offsets.
+        
+        :param offsets: The positions from which to read the integers.
+        :return: A list of the integer values.
+        """
+        unpack_from = self.INT.unpack_from
+        return [unpack_from(self.bb, offset)[0] for offset in offsets]
+    
+    def unpack_record(self, layout, offset):
+        """
+        Decodes a whole fixed-layout record with a single unpack call.
+        
+        :param layout: The RecordFormat describing the record's fields.
+        :param offset: The position of the record's first field.
+        :return: A list with one int or str per field.
+        """
+        return layout.decode(layout.codec.unpack_from(self.bb, offset))
+    
+    def pack_record(self, layout, offset, values):
+        """
+        Encodes a whole fixed-layout record with a single pack call.
+        
+        :param layout: The RecordFormat describing the record's fields.
+        :param offset: The position of the record's first field.
+        :param values: One int or str per field.
+        :raises ValueError: If a string is longer than its field
+        """
+        layout.codec.pack_into(self.bb, offset, *layout.encode(values))
     
     def get_bytes(self, offset):
         """
         Gets a byte array starting at the specified offset.
         
         :param offset: The position from which to start reading the byte array.
-        :return: A byte array.
+        :return: A copy of the bytes.
+        """
+        return bytes(self.get_bytes_view(offset))
+    
+    def get_bytes_view(self, offset):
+        """
+        Gets a byte array starting at the specified offset, without copying it.
+        The view is only valid while the page contents are unchanged.
+        
+        :param offset: The position from which to start reading the byte array.
+        :return: A memoryview over the bytes inside the page.
         """
         length = self.get_int(offset)
         start = offset + 4  # Skip the length integer
@@ -66,8 +117,7 @@ class Page:
         :param offset: The position from which to start reading the string.
         :return: The decoded string.
         """
-        b = self.get_bytes(offset)
-        return b.decode(self.CHARSET)
+        return str(self.get_bytes_view(offset), self.CHARSET)  # decodes straight from the page
 
     def set_string(self, offset, s):
         """
@@ -87,14 +137,88 @@ class Page:
         :param strlen: The length of the string.
         :return: The max length of the page.
         """
-        bytes_per_char = len('a'.encode(Page.CHARSET))  # Assuming 1 byte per character for ASCII
-        return struct.calcsize('>i') + (strlen * bytes_per_char)
+        return Page.INT.size + (strlen * Page.BYTES_PER_CHAR)
 
     def contents(self):
         """
-        Returns the underlying byte array (equivalent to ByteBuffer contents in Java).
+        Returns the underlying buffer (equivalent to ByteBuffer contents in Java).
+        File managers read into and write from it directly.
         
-        :return: The bytearray containing the page data.
+        :return: The memoryview over the page data.
         """
         return self.bb
 
+
+class RecordFormat:
+    """
+    A precompiled struct codec for a record of consecutive fields,
+    laid out exactly as the individual Page accessors would write them:
+    an int takes 4 bytes and a string takes Page.max_length(length) bytes.
+    """
+    INTEGER = 4  # same codes as record.schema.SqlType
+    VARCHAR = 12
+    
+    def __init__(self, fields):
+        """
+        Compiles the codec for the given fields.
+        
+        :param fields: A list of (field_type, length) pairs, in record order.
+                       The length of an integer field is ignored.
+        """
+        fmt = '>'
+        self.is_string = []
+        self.capacities = []  # bytes available to each string field
+        for field_type, length in fields:
+            if field_type == self.INTEGER:
+                fmt += 'i'
+            elif field_type == self.VARCHAR:
+                fmt += f'i{length * Page.BYTES_PER_CHAR}s'  # length prefix, then the characters
+            else:
+                raise ValueError(f"Unsupported field type {field_type}")
+            self.is_string.append(field_type == self.VARCHAR)
+            self.capacities.append(length * Page.BYTES_PER_CHAR if field_type == self.VARCHAR else 0)
+        self.codec = struct.Struct(fmt)
+        
+    def size(self):
+        """
+        Returns the number of bytes a record occupies in a page.
+        """
+        return self.codec.size
+    
+    def decode(self, raw):
+        """
+        Turns the flat tuple produced by the codec into one value per field.
+        
+        :param raw: The tuple returned by unpacking the codec.
+        :return: A list of the field values.
+        """
+        values = []
+        pos = 0
+        for is_string in self.is_string:
+            if is_string:
+                length, data = raw[pos], raw[pos + 1]
+                values.append(data[:length].decode(Page.CHARSET))
+                pos += 2
+            else:
+                values.append(raw[pos])
+                pos += 1
+        return values
+    
+    def encode(self, values):
+        """
+        Turns one value per field into the flat argument list of the codec.
+        
+        :param values: The field values, in record order.
+        :return: A list of the codec arguments.
+        :raises ValueError: If a string is longer than its field
+        """
+        args = []
+        for is_string, capacity, value in zip(self.is_string, self.capacities, values):
+            if is_string:
+                data = value.encode(Page.CHARSET)
+                if len(data) > capacity:
+                    raise ValueError(f"String {value!r} does not fit in a field of {capacity} bytes")
+                args.extend((len(data), data))
+            else:
+                args.append(value)
+        return args
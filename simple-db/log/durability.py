@@ -0,0 +1,157 @@
+import threading
+import time
+
+
+class DurabilityPolicy:
+    """
+    Decides when the log writer forces the log to stable storage,
+    how long a flushing transaction waits for it, and when the data files
+    written at commit are synced. Every sync is timed, so deployments can
+    compare the latency each policy adds against the durability it gives.
+
+    :ivar wait_for_sync: Whether LogManager.flush waits until the records are synced,
+                         rather than only written to the OS
+    :ivar gather_delay: Seconds the log writer waits for more committers before syncing
+    :ivar gather_size: Number of waiting committers that ends the wait early
+    :ivar interval: Seconds between background syncs, or None if the writer never syncs on its own
+    """
+    name = None
+    wait_for_sync = True
+    gather_delay = 0.0
+    gather_size = 1
+    interval = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending_files = set()  # data files written but not yet synced
+        self.log_syncs = 0
+        self.log_sync_time = 0.0
+        self.data_syncs = 0
+        self.data_sync_time = 0.0
+        self.max_sync_time = 0.0
+
+    def sync_log(self, file_manager, filename):
+        """
+        Syncs the log file, timing the call.
+
+        :param file_manager: The FileManager holding the log
+        :param filename: The name of the log file
+        """
+        elapsed = self._timed_sync(file_manager, filename)
+        with self.lock:
+            self.log_syncs += 1
+            self.log_sync_time += elapsed
+            self.max_sync_time = max(self.max_sync_time, elapsed)
+
+    def sync_data(self, file_manager, filenames):
+        """
+        Handles data files that were just written for a commit.
+        By default they are synced right away, after the log.
+
+        :param file_manager: The FileManager holding the files
+        :param filenames: The names of the written files
+        """
+        for filename in filenames:
+            elapsed = self._timed_sync(file_manager, filename)
+            with self.lock:
+                self.data_syncs += 1
+                self.data_sync_time += elapsed
+                self.max_sync_time = max(self.max_sync_time, elapsed)
+
+    def sync_pending(self, file_manager):
+        """
+        Syncs the data files whose sync was deferred by `sync_data`.
+
+        :param file_manager: The FileManager holding the files
+        """
+        with self.lock:
+            filenames = list(self.pending_files)
+            self.pending_files.clear()
+        DurabilityPolicy.sync_data(self, file_manager, filenames)
+
+    def stats(self):
+        """
+        Returns the policy's sync counters; times are in seconds.
+
+        :return: dict of counter name to value
+        """
+        with self.lock:
+            return {
+                "policy": self.name,
+                "log_syncs": self.log_syncs,
+                "log_sync_time": self.log_sync_time,
+                "data_syncs": self.data_syncs,
+                "data_sync_time": self.data_sync_time,
+                "max_sync_time": self.max_sync_time,
+            }
+
+    @staticmethod
+    def _timed_sync(file_manager, filename):
+        start = time.perf_counter()
+        file_manager.sync(filename)
+        return time.perf_counter() - start
+
+
+class SyncEveryCommit(DurabilityPolicy):
+    """
+    Every commit returns only after an fsync covering its log records and data.
+    The writer syncs as soon as a flush is requested; only the committers that
+    arrive while a sync is in progress share the next one.
+    """
+    name = "fsync"
+
+
+class GroupSync(DurabilityPolicy):
+    """
+    Like SyncEveryCommit, but the log writer waits briefly for other committers,
+    so that one fsync serves the whole group.
+    """
+    name = "group"
+
+    def __init__(self, delay=0.001, size=64):
+        """
+        :param delay: Maximum seconds the writer waits for other committers
+        :param size: Number of waiting committers that ends the wait early
+        """
+        super().__init__()
+        self.gather_delay = delay
+        self.gather_size = size
+
+
+class PeriodicSync(DurabilityPolicy):
+    """
+    Commits return once their log records are written to the OS.
+    The log writer syncs the log, then the data files written since,
+    every `interval_ms` milliseconds.
+
+    A crash can lose the commits of the last interval. Worse, write-ahead
+    logging no longer holds: a data page written to the OS may reach the disk
+    before the log records describing it, so recovery can find changes it
+    has no log records to undo. Like NoSync, this is only for data that can
+    be rebuilt after a crash, or where the OS and disk are trusted not to crash.
+    """
+    name = "periodic"
+    wait_for_sync = False
+
+    def __init__(self, interval_ms=100):
+        """
+        :param interval_ms: Milliseconds between syncs
+        """
+        super().__init__()
+        self.interval = interval_ms / 1000
+
+    def sync_data(self, file_manager, filenames):
+        with self.lock:
+            self.pending_files.update(filenames)
+
+
+class NoSync(DurabilityPolicy):
+    """
+    Never syncs; durability is left to the OS. Meant for bulk loads
+    that can be redone from scratch after a crash.
+    """
+    name = "none"
+    wait_for_sync = False
+
+    def sync_data(self, file_manager, filenames):
+        pass
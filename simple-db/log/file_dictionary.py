@@ -0,0 +1,68 @@
+import os
+import threading
+
+
+class FileDictionary:
+    """
+    A persistent dictionary of the file names referenced by log records,
+    so that a record can store a small file id instead of the name.
+    Ids are assigned in order of first use and never change; the dictionary
+    file holds one length-prefixed name per id, and a new name is synced
+    before any log record can refer to it.
+    """
+    SUFFIX = '.files'
+
+    def __init__(self, file_mgr, log_file):
+        """
+        Loads the dictionary of the specified log.
+
+        :param file_mgr: The FileManager holding the log
+        :param log_file: The name of the log
+        """
+        self.fm = file_mgr
+        self.filename = log_file + self.SUFFIX
+        self.lock = threading.Lock()
+        self.names = []  # file id -> file name
+        self.ids = {}  # file name -> file id
+
+        with self.fm.file_handles.open(self.filename) as fd:
+            data = os.pread(fd, os.fstat(fd).st_size, 0)
+        pos = 0
+        while pos < len(data) and pos + data[pos] < len(data):
+            name = data[pos + 1:pos + 1 + data[pos]].decode('utf-8')
+            pos += 1 + data[pos]
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        self.size = pos  # a torn last entry is overwritten by the next one
+
+    def id_of(self, filename):
+        """
+        Returns the id of a file name, adding the name to the dictionary if it is new.
+
+        :param filename: The file name, at most 255 bytes long in UTF-8
+        :return: The file id
+        """
+        file_id = self.ids.get(filename)
+        if file_id is not None:
+            return file_id
+        with self.lock:
+            if filename in self.ids:
+                return self.ids[filename]
+            encoded = filename.encode('utf-8')
+            if len(encoded) > 255:
+                raise ValueError(f"File name too long for the log: {filename}")
+            entry = bytes([len(encoded)]) + encoded
+            with self.fm.file_handles.open(self.filename) as fd:
+                os.pwrite(fd, entry, self.size)
+                os.fsync(fd)
+            self.size += len(entry)
+            self.ids[filename] = len(self.names)
+            self.names.append(filename)
+            return self.ids[filename]
+
+    def name_of(self, file_id):
+        """
+        :param file_id: A file id
+        :return: The file name with that id
+        """
+        return self.names[file_id]
@@ -0,0 +1,160 @@
+import argparse
+import random
+import tempfile
+import time
+
+from file.block_id import BlockId
+from file.file_manager import FileManager
+from file.page import Page
+from log.durability import NoSync
+from log.log_manager import LogManager
+from transaction.recovery.log_format import LogFormat
+from transaction.recovery.log_record import LogRecord
+
+
+def encode_fixed(op, tx_num, block=None, offset=None, val=None):
+    """
+    Encodes a record in the original fixed-width format: 4-byte ints for every
+    field and the file name as a length-prefixed string, as records were
+    written before LogFormat.
+
+    :param op: the record's operator
+    :param tx_num: the transaction number
+    :param block: the updated block, for update records
+    :param offset: the updated offset, for update records
+    :param val: the old value, for update records
+    :return: the encoded record
+    """
+    if block is None:
+        page = Page(bytearray(8))
+        page.set_int(0, op)
+        page.set_int(4, tx_num)
+        return bytes(page.contents())
+    bpos = 8 + Page.max_length(len(block.file_name()))
+    vpos = bpos + 8
+    size = vpos + (4 if op == LogRecord.SETINT else Page.max_length(len(val)))
+    page = Page(bytearray(size))
+    page.set_int(0, op)
+    page.set_int(4, tx_num)
+    page.set_string(8, block.file_name())
+    page.set_int(bpos, block.number())
+    page.set_int(bpos + 4, offset)
+    if op == LogRecord.SETINT:
+        page.set_int(vpos, val)
+    else:
+        page.set_string(vpos, val)
+    return bytes(page.contents())
+
+
+def workload(transactions, updates, unfinished, seed):
+    """
+    Generates the records of transactions updating random fields of a few
+    tables: (operator, tx, block, offset, old value) tuples.
+
+    :param transactions: the number of transactions
+    :param updates: the number of updates per transaction
+    :param unfinished: the share of transactions left without a COMMIT record
+    :param seed: the random seed
+    :return: list of record tuples, START and COMMIT records included
+    """
+    rng = random.Random(seed)
+    tables = ["student.tbl", "enroll.tbl", "course.tbl"]
+    records = []
+    for tx in range(1, transactions + 1):
+        records.append((LogRecord.START, tx, None, None, None))
+        for _ in range(updates):
+            block = BlockId.of(rng.choice(tables), rng.randrange(500))
+            offset = rng.randrange(100) * 4
+            if rng.random() < 0.8:
+                records.append((LogRecord.SETINT, tx, block, offset, rng.randrange(-1000, 100000)))
+            else:
+                records.append((LogRecord.SETSTRING, tx, block, offset, f"name{rng.randrange(10000)}"))
+        if rng.random() >= unfinished:
+            records.append((LogRecord.COMMIT, tx, None, None, None))
+    return records
+
+
+def run(dirname, records, compact, block_size):
+    """
+    Appends the records to a new log, then reads the whole log backwards
+    as recovery does: every record's header is read, and the records of
+    transactions that did not commit are decoded in full.
+
+    :param dirname: the database directory
+    :param records: the record tuples from `workload`
+    :param compact: write the compact format rather than the fixed-width one
+    :param block_size: the log block size
+    :return: dict with the update record bytes, the log blocks and the recovery scan time
+    """
+    file_manager = FileManager(dirname, block_size)
+    log_manager = LogManager(file_manager, "bench.log", durability=NoSync())
+    update_bytes = updates = 0
+    for op, tx, block, offset, val in records:
+        if compact:
+            rec = LogFormat.encode(op, tx, log_manager.file_ids, block, offset, val)
+        else:
+            rec = encode_fixed(op, tx, block, offset, val)
+        if block is not None:
+            update_bytes += len(rec)
+            updates += 1
+        log_manager.append(rec)
+    log_manager.flush_all()
+
+    blocks_read = file_manager.blocks_read
+    began = time.perf_counter()
+    finished = set()
+    for data in log_manager.iterator():
+        op, tx_number = LogRecord.header(data)
+        if op == LogRecord.COMMIT:
+            finished.add(tx_number)
+        elif tx_number not in finished:
+            LogRecord.create_log_record(data, log_manager.file_ids)  # the record undo() is called on
+    elapsed = time.perf_counter() - began
+
+    result = {
+        "bytes_per_update": update_bytes / updates,
+        "log_blocks": log_manager.segments.block_count,
+        "blocks_read": file_manager.blocks_read - blocks_read,
+        "scan_seconds": elapsed,
+        "records_per_second": len(records) / elapsed,
+    }
+    log_manager.close()
+    file_manager.close()
+    return result
+
+
+def compare(records, block_size):
+    """
+    Runs the records through both formats and prints a table row for each.
+
+    :param records: the record tuples from `workload`
+    :param block_size: the log block size
+    """
+    print(f"{'format':<8}{'B/update':>10}{'log blocks':>12}{'blocks read':>13}{'scan ms':>10}{'records/s':>12}")
+    for name, compact in (("fixed", False), ("compact", True)):
+        with tempfile.TemporaryDirectory() as dirname:
+            result = run(dirname, records, compact, block_size)
+        print(f"{name:<8}{result['bytes_per_update']:>10.1f}{result['log_blocks']:>12}{result['blocks_read']:>13}"
+              f"{result['scan_seconds'] * 1000:>10.1f}{result['records_per_second']:>12,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compares the size and recovery scan speed "
+                                                 "of the fixed-width and compact log formats.")
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=10, help="updates per transaction")
+    parser.add_argument("--unfinished", type=float, nargs="+", default=[0.0, 1.0],
+                        help="shares of transactions that did not commit, whose updates recovery decodes")
+    parser.add_argument("--block-size", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    for unfinished in args.unfinished:
+        records = workload(args.transactions, args.updates, unfinished, seed=1)
+        print(f"{len(records)} records, {args.transactions * args.updates} of them updates, "
+              f"{unfinished:.0%} of the transactions unfinished; recovery scan of the whole log "
+              f"with a warm OS page cache")
+        compare(records, args.block_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import struct
+import threading
+from bisect import bisect_right
+
+from file.page import Page
+from log.log_iterator import LogIterator
+
+
+class LogIndex:
+    """
+    A sidecar file next to the log holding the LSN of the first record
+    in each log block: an 8-byte header with the logical number of the first
+    indexed block, followed by one 8-byte entry per block.
+    It lets the log manager find the block holding any LSN without
+    scanning the log, and keeps LSNs stable across restarts.
+
+    New entries are written after the log blocks they describe and are not
+    synced; entries missing after a crash are rebuilt from the log itself.
+    A rewrite of the whole index is synced before and after it replaces the file.
+    """
+    ENTRY = struct.Struct('>q')
+    SUFFIX = '.idx'
+
+    def __init__(self, file_mgr, segments):
+        """
+        Loads the index of the specified log.
+
+        :param file_mgr: The FileManager holding the log
+        :param segments: The LogSegments of the log
+        """
+        self.fm = file_mgr
+        self.segments = segments
+        self.filename = segments.log_file + self.SUFFIX
+        self.lock = threading.Lock()
+
+        with self.fm.file_handles.open(self.filename) as fd:
+            data = os.pread(fd, os.fstat(fd).st_size, 0)
+        count = len(data) // self.ENTRY.size - 1
+        if count >= 0:
+            (self.base,) = self.ENTRY.unpack_from(data)
+            self.first_lsns = [lsn for (lsn,) in self.ENTRY.iter_unpack(data[self.ENTRY.size:(count + 1) * self.ENTRY.size])]
+        else:
+            self.base, self.first_lsns = segments.first_block(), []
+        self.written = len(self.first_lsns)  # entries already in the index file
+
+    def load(self):
+        """
+        Makes the index agree with the log segments: entries for deleted segments
+        and past the end of the log are dropped, and entries missing for the
+        last blocks are rebuilt by counting their records.
+        """
+        first = self.segments.first_block()
+        count = self.segments.block_count - first
+        rewrite = not self.written  # a new index file needs its header
+
+        if self.base < first:
+            del self.first_lsns[:first - self.base]
+            self.base, rewrite = first, True
+        if self.base > first or (self.first_lsns and self.first_lsns[0] != self.segments.first_lsn):
+            self.base, self.first_lsns, rewrite = first, [], True  # does not match the log; rebuild it
+        if len(self.first_lsns) > count:
+            del self.first_lsns[count:]
+            rewrite = True
+
+        page = Page(block_size=self.fm.block_size())
+        if not self.first_lsns and count > 0:
+            self.first_lsns.append(self.segments.first_lsn)
+        while len(self.first_lsns) < count:
+            previous = self.base + len(self.first_lsns) - 1
+            self.first_lsns.append(self.first_lsn(previous) + self.record_count(previous, page))
+
+        if rewrite:
+            self._rewrite()
+
+    def record_count(self, number, page):
+        """
+        Reads a log block and returns the number of records in it.
+
+        :param number: The logical number of the log block
+        :param page: A page to read the block into
+        :return: The number of records
+        """
+        self.fm.read_block(self.segments.block(number), page)
+        return len(LogIterator.record_offsets(page, self.fm.block_size()))
+
+    def add(self, number, first_lsn):
+        """
+        Records the first LSN of a new log block.
+
+        :param number: The logical number of the new block, following the last indexed one
+        :param first_lsn: The LSN of the first record the block will hold
+        """
+        with self.lock:
+            self.first_lsns.append(first_lsn)
+
+    def first_lsn(self, number):
+        """
+        :param number: The logical number of a log block
+        :return: The LSN of the first record in the block
+        """
+        with self.lock:
+            return self.first_lsns[number - self.base]
+
+    def block_of(self, lsn):
+        """
+        Finds the log block holding a record.
+
+        :param lsn: The LSN of the record
+        :return: The logical number of the block holding it
+        """
+        with self.lock:
+            return self.base + max(bisect_right(self.first_lsns, lsn) - 1, 0)
+
+    def truncate(self, first):
+        """
+        Drops the entries of the blocks before `first`, after their segments were deleted.
+
+        :param first: The logical number of the oldest block kept
+        """
+        with self.lock:
+            if first <= self.base:
+                return
+            del self.first_lsns[:first - self.base]
+            self.base = first
+        self._rewrite()
+
+    def write(self):
+        """
+        Appends the entries not yet in the index file.
+        """
+        with self.lock:
+            entries = self.first_lsns[self.written:]
+            if not entries:
+                return
+            data = b''.join(self.ENTRY.pack(lsn) for lsn in entries)
+            with self.fm.file_handles.open(self.filename) as fd:
+                os.pwrite(fd, data, (self.written + 1) * self.ENTRY.size)
+            self.written += len(entries)
+
+    def _rewrite(self):
+        """
+        Replaces the index file with the current entries.
+        The new file is synced, then renamed into place and the rename synced,
+        so a crash leaves either index intact.
+        """
+        with self.lock:
+            data = self.ENTRY.pack(self.base) + b''.join(self.ENTRY.pack(lsn) for lsn in self.first_lsns)
+            tmp_path = self.fm.db_directory / (self.filename + ".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.fm.file_handles.discard(self.filename)
+            os.replace(tmp_path, self.fm.db_directory / self.filename)
+            self.fm.sync_directory()
+            self.written = len(self.first_lsns)
@@ -1,48 +1,200 @@
-from file.block_id import BlockId
 from file.page import Page
 
 class LogIterator:
-    def __init__(self, file_mgr, blk):
+    READ_AHEAD = 64  # maximum number of log blocks fetched per read
+    FIRST_READ = 8  # blocks fetched by the first read; each later read doubles up to READ_AHEAD
+
+    def __init__(self, file_mgr, segments, number, lsn=0, skip=0):
         """
         Initializes the log iterator for traversing log records in reverse order.
-        
+
         :param file_mgr: The FileMgr instance used for reading blocks.
-        :param blk: The BlockId where the log starts.
+        :param segments: The LogSegments mapping log blocks to segment files.
+        :param number: The logical number of the block where the log starts.
+        :param lsn: The LSN of the first record returned.
+        :param skip: The number of newer records in the block to skip before it.
         """
         self.fm = file_mgr
-        self.blk = blk
-        self.p = Page(block_size=self.fm.block_size())  
-        self.move_to_block(self.blk)
+        self.segments = segments
+        self.number = number
+        self.pages = self.run_pages(self.fm.block_size(), self.READ_AHEAD)
+        self.run_length = self.FIRST_READ
+        self.first_read = self.last_read = -1  # block numbers held in self.pages
+        self.move_to_block(self.number)
+        for _ in range(skip):
+            self.current_pos += 4 + self.p.get_int(self.current_pos)
+        self.current_lsn = lsn + 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
 
     def has_next(self):
         """
         Determines if there are earlier records in the log file.
-        
+        Moves back past blocks without records, e.g. a block never written.
+
         :return: True if there is an earlier record, False otherwise.
         """
-        return self.current_pos < self.fm.block_size() or self.blk.number() > 0
+        while self.current_pos == self.fm.block_size() and self.number > self.segments.first_block():
+            self.number -= 1
+            self.move_to_block(self.number)
+        return self.current_pos < self.fm.block_size()
 
     def next(self):
         """
         Moves to the next log record in the block.
-        If there are no more log records in the block, moves to the previous block.
+        If there are no more log records in the block, moves to the previous block
+        that has records.
 
         :return: The next log record as a byte array.
         """
-        if self.current_pos == self.fm.block_size():
-            self.blk = BlockId(self.blk.file_name(), self.blk.number() - 1)
-            self.move_to_block(self.blk)
-        
+        if not self.has_next():
+            raise StopIteration("Start of the log")
+
         rec = self.p.get_bytes(self.current_pos)
         self.current_pos += 4 + len(rec)  # Integer size (4 bytes) + record length
+        self.current_lsn -= 1
         return rec
 
-    def move_to_block(self, blk):
+    def lsn(self):
+        """
+        :return: The LSN of the record last returned by `next`.
+        """
+        return self.current_lsn
+
+    def move_to_block(self, number):
         """
         Moves to the specified log block and positions it at the first record in that block.
-        
-        :param blk: The BlockId to move to.
+        Since the log is walked backwards, a block that has not been read yet
+        is fetched together with the blocks preceding it, in one vectored read
+        into the iterator's buffer. Reads start small, so that a short rollback
+        reads little, and double up to READ_AHEAD blocks for long walks.
+
+        :param number: The logical number of the block to move to.
         """
-        self.fm.read(blk, self.p)
-        self.boundary = self.p.get_int(0)
+        if not self.first_read <= number <= self.last_read:
+            self.first_read = max(self.segments.first_block(), number - self.run_length + 1)
+            self.last_read = number
+            self.run_length = min(self.run_length * 2, self.READ_AHEAD)
+            blocks = [self.segments.block(n) for n in range(self.first_read, self.last_read + 1)]
+            self.fm.read_blocks(blocks, self.pages[:len(blocks)])
+
+        self.p = self.pages[number - self.first_read]
+        self.boundary = self.p.get_int(0) or self.fm.block_size()  # a block never written is empty
         self.current_pos = self.boundary
+
+    @staticmethod
+    def run_pages(block_size, count):
+        """
+        Allocates one buffer for a run of log blocks and returns
+        a page over each block-sized slice of it.
+
+        :param block_size: The size of a block
+        :param count: The number of blocks in the buffer
+        :return: list of Pages sharing the buffer
+        """
+        buffer = memoryview(bytearray(block_size * count))
+        return [Page(buffer[i * block_size:(i + 1) * block_size]) for i in range(count)]
+
+    @staticmethod
+    def record_offsets(page, block_size):
+        """
+        Returns the offsets of the records in a log page, newest first.
+        Records are stacked from the end of the page towards its boundary,
+        so the oldest record is the last one in the page.
+
+        :param page: The log page
+        :param block_size: The size of the page
+        :return: list of record offsets
+        """
+        offsets = []
+        pos = page.get_int(0) or block_size
+        while pos < block_size:
+            offsets.append(pos)
+            pos += 4 + page.get_int(pos)
+        return offsets
+
+
+class ForwardLogIterator:
+    """
+    Traverses log records from older to newer, starting at any record,
+    e.g. to replay or ship the log from a checkpoint onwards.
+    """
+    READ_AHEAD = LogIterator.READ_AHEAD
+    FIRST_READ = LogIterator.FIRST_READ
+
+    def __init__(self, file_mgr, segments, number, last_block, lsn=1, skip=0):
+        """
+        :param file_mgr: The FileMgr instance used for reading blocks.
+        :param segments: The LogSegments mapping log blocks to segment files.
+        :param number: The logical number of the block holding the first record returned.
+        :param last_block: The logical number of the last log block to read.
+        :param lsn: The LSN of the first record returned.
+        :param skip: The number of older records in the block to skip before it.
+        """
+        self.fm = file_mgr
+        self.segments = segments
+        self.number = number
+        self.last_block = last_block
+        self.pages = LogIterator.run_pages(self.fm.block_size(), self.READ_AHEAD)
+        self.run_length = self.FIRST_READ
+        self.first_read = self.last_read = -1  # block numbers held in self.pages
+        self.move_to_block(self.number)
+        del self.offsets[len(self.offsets) - skip:]
+        self.current_lsn = lsn - 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def has_next(self):
+        """
+        Determines if there are later records in the log file.
+
+        :return: True if there is a later record, False otherwise.
+        """
+        while not self.offsets and self.number < self.last_block:
+            self.number += 1
+            self.move_to_block(self.number)
+        return bool(self.offsets)
+
+    def next(self):
+        """
+        Moves to the next later log record, moving to the following block when needed.
+
+        :return: The next log record as a byte array.
+        """
+        if not self.has_next():
+            raise StopIteration("End of the log")
+        rec = self.p.get_bytes(self.offsets.pop())
+        self.current_lsn += 1
+        return rec
+
+    def lsn(self):
+        """
+        :return: The LSN of the record last returned by `next`.
+        """
+        return self.current_lsn
+
+    def move_to_block(self, number):
+        """
+        Moves to the specified log block and positions it at its oldest record.
+        A block that has not been read yet is fetched together with the blocks
+        following it, growing from FIRST_READ to READ_AHEAD blocks per read.
+
+        :param number: The logical number of the block to move to.
+        """
+        if not self.first_read <= number <= self.last_read:
+            self.first_read = number
+            self.last_read = min(self.last_block, number + self.run_length - 1)
+            self.run_length = min(self.run_length * 2, self.READ_AHEAD)
+            blocks = [self.segments.block(n) for n in range(self.first_read, self.last_read + 1)]
+            self.fm.read_blocks(blocks, self.pages[:len(blocks)])
+
+        self.p = self.pages[number - self.first_read]
+        self.offsets = LogIterator.record_offsets(self.p, self.fm.block_size())  # popped oldest first
@@ -1,49 +1,134 @@
+import threading
+import time
+from collections import deque
+
 from file.page import Page
-from file.block_id import BlockId
-from log.log_iterator import LogIterator
+from log.durability import SyncEveryCommit
+from log.file_dictionary import FileDictionary
+from log.log_index import LogIndex
+from log.log_segments import LogSegments
+from log.log_iterator import LogIterator, ForwardLogIterator
 
 
 class LogManager:
-    def __init__(self, file_mgr, log_file):
+    LOG_BUFFERS = 2  # in-memory log pages: one being filled, the others being written
+
+    def __init__(self, file_mgr, log_file, durability=None, log_buffers=LOG_BUFFERS,
+                 segment_size=LogSegments.SEGMENT_SIZE):
         """
         Initializes the Log Manager for the specified log file.
         If the log file doesn't exist, it's created with an empty first block.
+        LSNs continue from the last record in the log, as found through its LogIndex.
+        The log is stored in segment files of `segment_size` bytes (see LogSegments).
+
+        Log records are appended to an in-memory log page. A dedicated
+        log-writer thread writes filled pages, and the partly filled page
+        when a flush asks for it, so appenders never wait on disk I/O
+        unless every log page is waiting to be written.
 
         :param file_mgr: The FileManager instance used for reading/writing files.
         :param logfile: The name of the log file.
+        :param durability: The DurabilityPolicy deciding when the log is synced,
+                           SyncEveryCommit by default.
+        :param log_buffers: Number of in-memory log pages, at least 2.
+        :param segment_size: The size of a log segment file in bytes.
         """
         self.fm = file_mgr
         self.log_file = log_file
+        self.durability = durability if durability is not None else SyncEveryCommit()
+        self.lock = threading.Condition()
+
+        self.free_pages = [Page(block_size=self.fm.block_size()) for _ in range(max(log_buffers, 2) - 1)]
+        self.full_pages = deque()  # (block, page, LSN of its last record), oldest first
+        self.requested_lsn = 0  # highest LSN a flush is waiting for
+        self.waiting = 0  # committers waiting in flush()
+        self.writer_error = None
+        self.closed = False
+
         self.log_page = Page(block_size=self.fm.block_size())  # Assuming Page is already defined
-        logsize = self.fm.length(self.log_file)
+        self.segments = LogSegments(self.fm, self.log_file, segment_size)
+        self.index = LogIndex(self.fm, self.segments)
+        self.index.load()
+        self.unsynced_files = set()  # segment files written since the last log sync
+        self.file_ids = FileDictionary(self.fm, self.log_file)  # file ids used by log records
 
-        if logsize == 0:
+        if self.segments.block_count == self.segments.first_block():
+            self.latest_lsn = self.segments.first_lsn - 1
             self.current_blk = self.append_new_block()
+            self.fm.write(self.current_blk, self.log_page)
+            self.index.write()
         else:
-            self.current_blk = BlockId(self.log_file, logsize - 1)
-            self.fm.read(self.current_blk, self.log_page)
+            number = self.segments.block_count - 1
+            self.current_blk = self.segments.block(number)
+            self.fm.read_block(self.current_blk, self.log_page)
+            if self.log_page.get_int(0) == 0:  # the block was never written
+                self.log_page.set_int(0, self.fm.block_size())
+            records = len(LogIterator.record_offsets(self.log_page, self.fm.block_size()))
+            self.latest_lsn = self.index.first_lsn(number) + records - 1
+
+        self.last_written_lsn = self.latest_lsn  # written to the OS
+        self.last_saved_lsn = self.latest_lsn  # synced to stable storage
+        self.next_sync = time.monotonic()
 
-        self.latest_lsn = 0
-        self.last_saved_lsn = 0
+        self.writer = threading.Thread(target=self._write_log, name="log-writer", daemon=True)
+        self.writer.start()
 
     def flush(self, lsn):
         """
         Ensures that the log record corresponding to the specified LSN has been written to disk.
         All earlier log records will also be written to disk.
 
+        The caller waits until the log writer's durable LSN reaches `lsn`, or only
+        its written LSN if the durability policy does not wait for syncs;
+        concurrent callers are served by the same write and sync.
+
         :param lsn: The LSN (Log Sequence Number) of a log record.
         """
-        if lsn >= self.last_saved_lsn:
-            self.flush_all()
+        with self.lock:
+            if lsn <= self._flushed_lsn():
+                return
+            self.requested_lsn = max(self.requested_lsn, lsn)
+            self.waiting += 1
+            self.lock.notify_all()
+            try:
+                while lsn > self._flushed_lsn() and self.writer_error is None:
+                    self.lock.wait()
+            finally:
+                self.waiting -= 1
 
-    def iterator(self):
+            if lsn > self._flushed_lsn():
+                raise RuntimeError(f"Error writing the log: {self.writer_error}")
+
+    def iterator(self, from_lsn=None, forward=False):
         """
-        Returns an iterator to iterate through the log records in reverse order.
+        Returns an iterator to iterate through the log records in reverse order,
+        or in forward order if `forward` is set. The log index locates the block
+        holding the starting record, so no earlier blocks are read.
 
-        :return: LogIterator object for iterating over log records.
+        :param from_lsn: The LSN of the first record returned; by default the latest
+                         record when iterating backwards, and the oldest one forwards.
+                         An LSN beyond the log's records yields an empty iterator.
+        :param forward: Iterate from older to newer records.
+        :return: LogIterator or ForwardLogIterator object for iterating over log records.
         """
         self.flush_all()
-        return LogIterator(self.fm, self.current_blk)
+        with self.lock:
+            latest_lsn = self.latest_lsn
+            last_block = self.segments.block_count - 1
+        oldest_lsn = self.segments.first_lsn
+        if forward:
+            lsn = from_lsn if from_lsn is not None else oldest_lsn
+            lsn = min(max(lsn, oldest_lsn), latest_lsn + 1)
+        else:
+            lsn = from_lsn if from_lsn is not None else latest_lsn
+            lsn = min(max(lsn, oldest_lsn - 1), latest_lsn)
+
+        number = min(self.index.block_of(lsn), last_block)
+        first_lsn = self.index.first_lsn(number)
+        if forward:
+            return ForwardLogIterator(self.fm, self.segments, number, last_block, lsn, skip=max(lsn - first_lsn, 0))
+        last_lsn = latest_lsn if number == last_block else self.index.first_lsn(number + 1) - 1
+        return LogIterator(self.fm, self.segments, number, lsn, skip=last_lsn - lsn)
 
     def append(self, logrec):
         """
@@ -52,35 +137,207 @@ class LogManager:
         :param logrec: The byte array representing the log record to be appended.
         :return: The LSN of the appended log record.
         """
-        boundary = self.log_page.get_int(0)
-        recsize = len(logrec)
-        bytes_needed = recsize + 4  # Integer.BYTES is 4
-
-        if boundary - bytes_needed < 4:  # The log record doesn't fit, so move to the next block.
-            self.flush_all()
-            self.current_blk = self.append_new_block()
+        with self.lock:
             boundary = self.log_page.get_int(0)
+            recsize = len(logrec)
+            bytes_needed = recsize + 4  # Integer.BYTES is 4
+
+            if boundary - bytes_needed < 4:  # The log record doesn't fit, so move to the next block.
+                self._hand_off_page()
+                boundary = self.log_page.get_int(0)
 
-        recpos = boundary - bytes_needed
-        self.log_page.set_bytes(recpos, logrec)
-        self.log_page.set_int(0, recpos)  # The new boundary
-        self.latest_lsn += 1
-        return self.latest_lsn
+            recpos = boundary - bytes_needed
+            self.log_page.set_bytes(recpos, logrec)
+            self.log_page.set_int(0, recpos)  # The new boundary
+            self.latest_lsn += 1
+            return self.latest_lsn
 
     def append_new_block(self):
         """
-        Initializes a new block, appends it to the log file, and returns the BlockId.
+        Initializes a new block, appends it to the log, and returns its BlockId
+        in the segment file. The block reaches the disk when the log writer
+        next writes the log page.
 
         :return: The BlockId of the newly created block.
         """
-        blk = self.fm.append(self.log_file)
+        number, blk = self.segments.append()
         self.log_page.set_int(0, self.fm.block_size())  # Set boundary to block size
-        self.fm.write(blk, self.log_page)
+        self.index.add(number, self.latest_lsn + 1)
         return blk
 
     def flush_all(self):
         """
         Writes the current log buffer to the log file and updates the last saved LSN.
         """
-        self.fm.write(self.current_blk, self.log_page)
-        self.last_saved_lsn = self.latest_lsn
+        self.flush(self.latest_lsn)
+
+    def sync_data(self, filenames):
+        """
+        Syncs data files written for a commit, as the durability policy dictates.
+        Called after the log has been flushed for the written blocks.
+
+        :param filenames: The names of the written files
+        """
+        self.durability.sync_data(self.fm, filenames)
+        if self.durability.pending_files:
+            with self.lock:
+                self.lock.notify_all()  # let a periodic writer schedule the deferred sync
+
+    def close(self):
+        """
+        Writes any remaining log records and stops the log writer.
+        Unless the policy never syncs, the log and any deferred data files are synced.
+        """
+        self.flush_all()
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.writer.join()
+        self.index.write()
+        if self.durability.interval is not None and self.writer_error is None:
+            self._sync_log()
+            self.durability.sync_pending(self.fm)
+            self.last_saved_lsn = self.last_written_lsn
+
+    def truncate(self, lsn):
+        """
+        Deletes the log segments holding only records older than `lsn`,
+        e.g. after a quiescent checkpoint whose LSN is `lsn`,
+        since recovery never reads the log beyond it.
+        The oldest remaining segment is recorded in the control file first.
+
+        :param lsn: The LSN of the oldest record still needed
+        """
+        self.flush(lsn)
+        with self.lock:
+            segment = self.index.block_of(lsn) // self.segments.blocks_per_segment
+            first_block = segment * self.segments.blocks_per_segment
+            if first_block <= self.segments.first_block():
+                return
+            first_lsn = self.index.first_lsn(first_block)
+            deleted = range(self.segments.first_segment, segment)
+            self.unsynced_files -= {self.segments.segment_name(old) for old in deleted}
+        self.segments.truncate(segment, first_lsn)
+        self.index.truncate(first_block)
+
+    def _sync_log(self):
+        """
+        Syncs the segment files written since the last sync.
+        """
+        with self.lock:
+            files, self.unsynced_files = self.unsynced_files, set()
+        for filename in sorted(files):
+            self.durability.sync_log(self.fm, filename)
+
+    def _flushed_lsn(self):
+        """
+        Returns the LSN a flush has to wait for under the durability policy.
+        """
+        return self.last_saved_lsn if self.durability.wait_for_sync else self.last_written_lsn
+
+    def _sync_due(self):
+        """
+        Returns whether the writer has to sync now. Called with the lock held.
+        """
+        if self.durability.wait_for_sync:
+            return self.requested_lsn > self.last_saved_lsn
+        return (self.durability.interval is not None and self._unsynced()
+                and time.monotonic() >= self.next_sync)
+
+    def _wait_timeout(self):
+        """
+        Returns how long the idle writer may sleep before a periodic sync is due,
+        or None to sleep until notified. Called with the lock held.
+        """
+        if self.durability.interval is None or not self._unsynced():
+            return None
+        return max(self.next_sync - time.monotonic(), 0)
+
+    def _unsynced(self):
+        """
+        Returns whether log records or data files are written but not synced.
+        """
+        return self.last_written_lsn > self.last_saved_lsn or bool(self.durability.pending_files)
+
+    def _hand_off_page(self):
+        """
+        Queues the full log page for the log writer and continues in a free page
+        for a new block, waiting only if the writer has not freed one yet.
+        Called with the lock held.
+        """
+        while not self.free_pages and self.writer_error is None:
+            self.lock.wait()
+        if self.writer_error is not None:
+            raise RuntimeError(f"Error writing the log: {self.writer_error}")
+
+        self.full_pages.append((self.current_blk, self.log_page, self.latest_lsn))
+        self.lock.notify_all()
+        self.log_page = self.free_pages.pop()
+        self.current_blk = self.append_new_block()
+
+    def _write_log(self):
+        """
+        The log writer's loop. It writes the full pages in order, plus a copy
+        of the current page when a flush is waiting for records in it.
+        When the durability policy asks for it, the writer then syncs the log
+        once and advances the durable LSN; periodic policies also sync the data
+        files written since the last sync.
+        """
+        policy = self.durability
+        while True:
+            with self.lock:
+                while not (self.full_pages or self.requested_lsn > self.last_written_lsn
+                           or self._sync_due() or self.closed):
+                    self.lock.wait(self._wait_timeout())
+                if self.closed and not self.full_pages and self.requested_lsn <= self._flushed_lsn():
+                    return
+
+                if policy.wait_for_sync and self.requested_lsn > self.last_saved_lsn:
+                    deadline = time.monotonic() + policy.gather_delay
+                    while self.waiting < policy.gather_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.lock.wait(remaining)
+
+                full = list(self.full_pages)
+                self.full_pages.clear()
+                blocks = [blk for blk, _, _ in full]
+                pages = [page for _, page, _ in full]
+                lsn = full[-1][2] if full else self.last_written_lsn
+                if self.requested_lsn > lsn:
+                    # The flush needs records in the page being filled; write a copy of it
+                    blocks.append(self.current_blk)
+                    pages.append(Page(byte_array=bytes(self.log_page.contents())))
+                    lsn = self.latest_lsn
+                lsn = max(lsn, self.last_written_lsn)
+                periodic = policy.interval is not None and time.monotonic() >= self.next_sync
+                sync = (policy.wait_for_sync and self.requested_lsn > self.last_saved_lsn) or \
+                       (periodic and lsn > self.last_saved_lsn)
+
+            try:
+                self.fm.write_blocks(blocks, pages)
+                self.index.write()
+                with self.lock:
+                    self.unsynced_files.update(blk.file_name() for blk in blocks)
+                    # Flushes that do not wait for the sync can return now
+                    self.last_written_lsn = lsn
+                    self.free_pages.extend(page for _, page, _ in full)
+                    self.lock.notify_all()
+                if sync:
+                    self._sync_log()
+                if periodic:
+                    policy.sync_pending(self.fm)
+                self.segments.prepare_next()
+            except Exception as e:
+                with self.lock:
+                    self.writer_error = e
+                    self.lock.notify_all()
+                return
+
+            with self.lock:
+                if sync:
+                    self.last_saved_lsn = max(self.last_saved_lsn, lsn)
+                if periodic:
+                    self.next_sync = time.monotonic() + policy.interval
+                self.lock.notify_all()
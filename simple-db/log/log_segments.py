@@ -0,0 +1,144 @@
+import os
+import struct
+import threading
+
+from file.block_id import BlockId
+from file.page import Page
+
+
+class LogSegments:
+    """
+    Splits the log into segment files of a fixed number of blocks,
+    named <log file>.<segment number>. Log block numbers are logical:
+    block n is stored in segment n // blocks_per_segment.
+
+    A control file, <log file>.ctl, records the oldest segment still needed
+    for recovery and the LSN of its first record. Older segments are deleted
+    once a checkpoint makes them unnecessary. The segment after the current
+    one is created, with its first extent preallocated, ahead of time, off
+    the commit path.
+    """
+    SEGMENT_SIZE = 1024 * 1024  # bytes per segment, rounded down to whole blocks
+    CONTROL = struct.Struct('>qq')  # oldest segment, LSN of its first record
+    CONTROL_SUFFIX = '.ctl'
+
+    def __init__(self, file_mgr, log_file, segment_size=SEGMENT_SIZE):
+        """
+        Opens the segments of the specified log, finding its end.
+
+        :param file_mgr: The FileManager holding the segment files
+        :param log_file: The name of the log; segment names extend it
+        :param segment_size: The size of a segment in bytes, at least one block
+        """
+        self.fm = file_mgr
+        self.log_file = log_file
+        self.control_file = log_file + self.CONTROL_SUFFIX
+        self.blocks_per_segment = max(segment_size // self.fm.block_size(), 1)
+        self.lock = threading.Lock()
+        self._migrate()
+
+        with self.fm.file_handles.open(self.control_file) as fd:
+            data = os.pread(fd, self.CONTROL.size, 0)
+        if len(data) == self.CONTROL.size:
+            self.first_segment, self.first_lsn = self.CONTROL.unpack(data)
+        else:
+            self.first_segment, self.first_lsn = 0, 1
+
+        segment = self.first_segment
+        while self._exists(segment + 1) and self.fm.length(self.segment_name(segment + 1)) > 0:
+            segment += 1
+        self.block_count = segment * self.blocks_per_segment + self.fm.length(self.segment_name(segment))
+        self.prepared = segment + 1 if self._exists(segment + 1) else segment  # last segment created
+
+    def segment_name(self, segment):
+        """
+        :param segment: The segment number
+        :return: The name of the segment's file
+        """
+        return f"{self.log_file}.{segment:06d}"
+
+    def first_block(self):
+        """
+        :return: The logical number of the oldest block still in the log
+        """
+        return self.first_segment * self.blocks_per_segment
+
+    def block(self, number):
+        """
+        Maps a logical log block number to the block of its segment file.
+
+        :param number: The logical block number
+        :return: The BlockId within the segment file
+        """
+        segment, offset = divmod(number, self.blocks_per_segment)
+        return BlockId.of(self.segment_name(segment), offset)
+
+    def append(self):
+        """
+        Appends a new block at the end of the log, in a new segment if the current one is full.
+
+        :return: The logical number of the new block and its BlockId in the segment file
+        """
+        number = self.block_count
+        blk = self.fm.append(self.segment_name(number // self.blocks_per_segment))
+        self.block_count += 1
+        return number, blk
+
+    def prepare_next(self):
+        """
+        Creates the segment following the current one and preallocates its
+        first extent, if that has not been done yet. Called by the log writer,
+        so that the append that crosses into the next segment does not have to
+        allocate it. The rest of the segment grows an extent at a time, as
+        any file does, which keeps the zero tail a crash leaves behind short.
+        """
+        segment = self.block_count // self.blocks_per_segment + 1
+        with self.lock:
+            if segment <= self.prepared:
+                return
+            self.prepared = segment
+        size = min(self.blocks_per_segment * self.fm.block_size(), self.fm.extent_size())
+        self.fm.preallocate(self.segment_name(segment), size)
+
+    def truncate(self, segment, first_lsn):
+        """
+        Records `segment` as the oldest segment still needed, then deletes the older ones.
+        The control file is synced before any segment is deleted.
+
+        :param segment: The oldest segment to keep
+        :param first_lsn: The LSN of the first record in that segment
+        """
+        with self.lock:
+            old_first = self.first_segment
+            if segment <= old_first:
+                return
+            with self.fm.file_handles.open(self.control_file) as fd:
+                os.pwrite(fd, self.CONTROL.pack(segment, first_lsn), 0)
+                os.fsync(fd)
+            self.first_segment, self.first_lsn = segment, first_lsn
+
+        for old in range(old_first, segment):
+            self.fm.delete(self.segment_name(old))
+
+    def _migrate(self):
+        """
+        Splits a log written before the log was segmented, a single file named
+        after the log, into segment files, so that its records stay readable.
+        The old file is deleted once the segments are synced; if that does not
+        happen, e.g. after a crash, the next start migrates it again.
+        """
+        if not (self.fm.db_directory / self.log_file).is_file():
+            return
+        page = Page(block_size=self.fm.block_size())
+        segments = set()
+        for n in range(self.fm.length(self.log_file)):
+            self.fm.read_block(BlockId.of(self.log_file, n), page)
+            blk = self.block(n)
+            self.fm.write(blk, page)
+            segments.add(blk.file_name())
+        for filename in segments:
+            self.fm.sync(filename)
+        self.fm.delete(self.log_file)
+
+    def _exists(self, segment):
+        return (self.fm.db_directory / self.segment_name(segment)).exists()
@@ -1,9 +1,14 @@
 import os
+import json
 import logging
+import threading
 from pathlib import Path
 from file.file_manager import FileManager
+from file.mmap_file_manager import MmapFileManager
+from file.compressed_file_manager import CompressedFileManager
 from log.log_manager import LogManager
 from buffer.buffer_manager import BufferManager
+from buffer.sharded_buffer_manager import ShardedBufferManager
 from transaction.transaction import Transaction
 from transaction.recovery.recovery_manager import RecoveryManager
 
@@ -14,22 +19,58 @@ class SimpleDB:
     BLOCK_SIZE = 400
     BUFFER_SIZE = 8
     LOG_FILE = 'simpledb.log'
+    STATS_LOGGER = 'simpledb.stats'
     
-    def __init__(self, dirname, block_size=BLOCK_SIZE, buffer_size=BUFFER_SIZE):
+    def __init__(self, dirname, block_size=BLOCK_SIZE, buffer_size=BUFFER_SIZE, use_mmap=False, codec=None,
+                 direct_io=False, read_ahead_window=0, durability=None, replacement=BufferManager.REPLACEMENT,
+                 pin_timeout=BufferManager.MAX_TIME, clean_target=0, buffer_shards=1, stats_interval=0):
         """
         Initializes the SimpleDB engine.
         
         :param dirname: Name of the database directory
         :param block_size: Size of database blocks
         :param buffer_size: Number of buffers
+        :param use_mmap: Serve blocks from memory-mapped files instead of read/write calls
+        :param codec: Codec used to store data files compressed, or None to store them raw
+        :param direct_io: Bypass the OS page cache for data files, falling back to
+                          cached I/O where the filesystem or block size does not allow it
+        :param read_ahead_window: Number of blocks read ahead of sequential scans, 0 to disable
+        :param durability: DurabilityPolicy for the log and committed data, e.g. SyncEveryCommit(),
+                           GroupSync(delay), PeriodicSync(interval_ms) or NoSync() for bulk loads;
+                           SyncEveryCommit by default
+        :param replacement: Buffer replacement policy: "lru", "clock", "lru2" or "2q"
+        :param pin_timeout: Milliseconds a pin waits for a free buffer before the transaction must abort
+        :param clean_target: Share of the buffer pool a background writer keeps clean, e.g. 0.25;
+                             0 disables the writer
+        :param buffer_shards: Number of independently latched shards the buffer pool is split into,
+                              for many concurrent threads; 1 keeps a single pool
+        :param stats_interval: Seconds between dumps of `stats()` to the 'simpledb.stats' logger, 0 for none
         """
         
         self.db_directory = Path(dirname)
         self.db_directory.mkdir(parents=True, exist_ok=True)
         
-        self.file_manager = FileManager(self.db_directory, block_size)
-        self.log_manager = LogManager(self.file_manager, self.LOG_FILE)
-        self.buffer_manager = BufferManager(buffer_size, self.file_manager, self.log_manager)
+        if codec is not None and use_mmap:
+            raise ValueError("Compressed data files cannot be memory-mapped")
+        if direct_io and (use_mmap or codec is not None):
+            raise ValueError("Direct I/O only applies to raw, unmapped data files")
+        if direct_io:
+            self.file_manager = FileManager(self.db_directory, block_size, direct_io=True, buffered=(self.LOG_FILE,))
+        elif codec is not None:
+            self.file_manager = CompressedFileManager(self.db_directory, block_size, codec, uncompressed=(self.LOG_FILE,))
+        else:
+            file_manager_class = MmapFileManager if use_mmap else FileManager
+            self.file_manager = file_manager_class(self.db_directory, block_size)
+        self.log_manager = LogManager(self.file_manager, self.LOG_FILE, durability=durability)
+        if buffer_shards > 1:
+            self.buffer_manager = ShardedBufferManager(buffer_size, self.file_manager, self.log_manager,
+                                                       shards=buffer_shards, read_ahead_window=read_ahead_window,
+                                                       replacement=replacement, max_wait=pin_timeout,
+                                                       clean_target=clean_target)
+        else:
+            self.buffer_manager = BufferManager(buffer_size, self.file_manager, self.log_manager,
+                                                read_ahead_window=read_ahead_window, replacement=replacement,
+                                                max_wait=pin_timeout, clean_target=clean_target)
         
         tx = self.new_tx()
         is_new = self.file_manager.is_new()
@@ -38,6 +79,10 @@ class SimpleDB:
         else:
             print("Recovering existing database")
             tx.recover()
+        
+        self.stats_stopped = threading.Event()
+        if stats_interval > 0:
+            self.dump_stats(stats_interval)
    
         
         
@@ -45,4 +90,55 @@ class SimpleDB:
         """
         Creates a new transaction.
         """
-        return Transaction(self.file_manager, self.buffer_manager, self.log_manager)
\ No newline at end of file
+        return Transaction(self.file_manager, self.buffer_manager, self.log_manager)
+    
+    def stats(self):
+        """
+        Returns the engine's counters and latency histograms; times are in seconds.
+        
+        :return: dict with the buffer pool's counters under "buffers",
+                 the data and log files' under "files" and the log's syncs under "log"
+        """
+        files = self.file_manager.io_stats()
+        files["handles"] = self.file_manager.file_stats()
+        if isinstance(self.file_manager, CompressedFileManager):
+            files["compression"] = self.file_manager.compression_stats()
+        return {
+            "buffers": self.buffer_manager.stats(),
+            "files": files,
+            "log": self.log_manager.durability.stats(),
+        }
+    
+    def dump_stats(self, interval):
+        """
+        Starts a daemon thread that logs `stats()` as one line of JSON
+        to the 'simpledb.stats' logger, at INFO level, every `interval` seconds,
+        until `stop_stats` is called.
+        
+        :param interval: Seconds between dumps
+        """
+        logger = logging.getLogger(self.STATS_LOGGER)
+        
+        def dump():
+            while not self.stats_stopped.wait(interval):
+                logger.info(json.dumps(self.stats(), sort_keys=True))
+        
+        threading.Thread(target=dump, name="stats-dump", daemon=True).start()
+    
+    def stop_stats(self):
+        """
+        Stops the periodic stats dumps.
+        """
+        self.stats_stopped.set()
+    
+    def close(self):
+        """
+        Shuts the engine down once every transaction has committed or rolled back.
+        The layers are closed top down: the buffer pool's background threads stop,
+        then the log writes its remaining records and takes its final sync,
+        then the files are trimmed and closed, compressed files getting their block maps.
+        """
+        self.stop_stats()
+        self.buffer_manager.close()
+        self.log_manager.close()
+        self.file_manager.close()
@@ -0,0 +1,70 @@
+import pytest
+
+from file.block_id import BlockId
+from file.compressed_file_manager import CompressedFileManager
+from file.file_manager import FileManager
+from file.mmap_file_manager import MmapFileManager
+from file.page import Page
+
+BLOCK_SIZE = 400
+MANAGERS = [FileManager, MmapFileManager, CompressedFileManager]
+
+
+def write_int(file_manager, block, value):
+    page = file_manager.new_page()
+    page.set_int(0, value)
+    file_manager.write(block, page)
+
+
+def read_int(file_manager, block):
+    page = Page(BLOCK_SIZE)
+    file_manager.read_block(block, page)
+    return page.get_int(0)
+
+
+@pytest.mark.parametrize("manager", MANAGERS)
+def test_length_survives_clean_close(tmp_path, manager):
+    """Blocks appended but never written still count after a clean close."""
+    file_manager = manager(tmp_path, BLOCK_SIZE)
+    for _ in range(5):
+        file_manager.append("t")
+    write_int(file_manager, BlockId.of("t", 2), 7)
+    file_manager.close()
+
+    file_manager = manager(tmp_path, BLOCK_SIZE)
+    assert file_manager.length("t") == 5
+    assert read_int(file_manager, BlockId.of("t", 2)) == 7
+    assert file_manager.append("t").number() == 5
+    file_manager.close()
+
+
+@pytest.mark.parametrize("manager", MANAGERS)
+def test_length_survives_crash_after_sync(tmp_path, manager):
+    """A sync makes the appended blocks count, even if the file is never closed."""
+    file_manager = manager(tmp_path, BLOCK_SIZE)
+    for _ in range(3):
+        file_manager.append("t")
+    write_int(file_manager, BlockId.of("t", 0), 1)
+    file_manager.sync("t")
+
+    restarted = manager(tmp_path, BLOCK_SIZE)  # the first manager is never closed, as in a crash
+    assert restarted.length("t") == 3
+    assert read_int(restarted, BlockId.of("t", 0)) == 1
+    restarted.close()
+
+
+@pytest.mark.parametrize("manager", MANAGERS)
+def test_length_after_crash_covers_written_blocks(tmp_path, manager):
+    """Without a sync, every block written before the crash still counts."""
+    file_manager = manager(tmp_path, BLOCK_SIZE)
+    for _ in range(4):
+        file_manager.append("t")
+    file_manager.sync("t")
+    for _ in range(4):
+        file_manager.append("t")
+    write_int(file_manager, BlockId.of("t", 6), 42)
+
+    restarted = manager(tmp_path, BLOCK_SIZE)
+    assert restarted.length("t") == 7
+    assert read_int(restarted, BlockId.of("t", 6)) == 42
+    restarted.close()
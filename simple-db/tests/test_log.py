@@ -0,0 +1,38 @@
+import pytest
+
+from file.file_manager import FileManager
+from log.log_manager import LogManager
+
+BLOCK_SIZE = 400
+SEGMENT_SIZE = 2 * BLOCK_SIZE  # a few records per block, two blocks per segment
+
+
+def record(i):
+    return f"record {i:04d} ".encode() * 6
+
+
+@pytest.mark.parametrize("crash", [False, True])
+def test_iteration_across_segments_and_restart(tmp_path, crash):
+    """Records written before and after a restart are iterated in order over many segments."""
+    file_manager = FileManager(tmp_path, BLOCK_SIZE)
+    log_manager = LogManager(file_manager, "test.log", segment_size=SEGMENT_SIZE)
+    lsns = [log_manager.append(record(i)) for i in range(100)]
+    log_manager.flush_all()
+    assert log_manager.segments.block_count > 10
+    if not crash:
+        log_manager.close()
+        file_manager.close()
+
+    file_manager = FileManager(tmp_path, BLOCK_SIZE)
+    log_manager = LogManager(file_manager, "test.log", segment_size=SEGMENT_SIZE)
+    lsns += [log_manager.append(record(i)) for i in range(100, 150)]
+    log_manager.flush_all()
+    assert lsns == list(range(lsns[0], lsns[0] + 150))  # LSNs continue after the restart
+
+    expected = [record(i) for i in range(150)]
+    assert [bytes(rec) for rec in log_manager.iterator()] == expected[::-1]
+    assert [bytes(rec) for rec in log_manager.iterator(forward=True)] == expected
+    assert [bytes(rec) for rec in log_manager.iterator(from_lsn=lsns[120])] == expected[120::-1]
+    assert [bytes(rec) for rec in log_manager.iterator(from_lsn=lsns[80], forward=True)] == expected[80:]
+    log_manager.close()
+    file_manager.close()
@@ -0,0 +1,71 @@
+from buffer.buffer_manager import BufferManager
+from buffer.buffer_ring import BufferRing
+from file.block_id import BlockId
+from file.file_manager import FileManager
+from log.log_manager import LogManager
+
+BLOCK_SIZE = 400
+SCANNED = 200
+HOT = 5
+
+
+def make_files(tmp_path):
+    file_manager = FileManager(tmp_path, BLOCK_SIZE)
+    page = file_manager.new_page()
+    for n in range(SCANNED):
+        page.set_int(0, n)
+        file_manager.write(file_manager.append("scan"), page)
+    for _ in range(HOT):
+        file_manager.append("hot")
+    return file_manager, LogManager(file_manager, "test.log")
+
+
+def scan(buffer_manager, ring=None):
+    values = []
+    for n in range(SCANNED):
+        buffer = buffer_manager.pin(BlockId.of("scan", n), ring)
+        values.append(buffer.contents().get_int(0))
+        buffer_manager.unpin(buffer)
+    return values
+
+
+def touch_hot_set(buffer_manager, times=3):
+    for _ in range(times):
+        for n in range(HOT):
+            buffer_manager.unpin(buffer_manager.pin(BlockId.of("hot", n)))
+
+
+def resident_hot_blocks(buffer_manager):
+    return sum(1 for n in range(HOT) if BlockId.of("hot", n) in buffer_manager.buffer_table)
+
+
+def test_read_ahead_scan_keeps_hot_set(tmp_path):
+    """A scan served by read-ahead reads every block right and leaves the hot set in the pool."""
+    file_manager, log_manager = make_files(tmp_path)
+    buffer_manager = BufferManager(20, file_manager, log_manager, read_ahead_window=6, replacement="lru2")
+    touch_hot_set(buffer_manager)
+
+    assert scan(buffer_manager) == list(range(SCANNED))
+    buffer_manager.close()  # waits for the outstanding reads
+
+    stats = buffer_manager.read_ahead.stats()
+    assert stats["hits"] > 0
+    assert stats["issued"] == stats["completed"] + stats["skipped"] + stats["cancelled"]
+    assert stats["hits"] + stats["wasted"] <= stats["completed"]
+    assert buffer_manager.available() == 20
+    assert resident_hot_blocks(buffer_manager) == HOT
+    log_manager.close()
+    file_manager.close()
+
+
+def test_ring_scan_keeps_hot_set(tmp_path):
+    """A scan confined to a BufferRing does not evict the hot set, even under LRU."""
+    file_manager, log_manager = make_files(tmp_path)
+    buffer_manager = BufferManager(20, file_manager, log_manager)
+    touch_hot_set(buffer_manager, times=1)
+
+    assert scan(buffer_manager, BufferRing(4)) == list(range(SCANNED))
+    assert resident_hot_blocks(buffer_manager) == HOT
+    buffer_manager.close()
+    log_manager.close()
+    file_manager.close()
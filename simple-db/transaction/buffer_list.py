@@ -17,15 +17,16 @@ class BufferList:
         return self.buffers.get(block)
     
     
-    def pin(self, block):
+    def pin(self, block, ring=None):
         """
         Pin the block and keep track of the buffer internally
         
         :param block: a reference to the disk block
+        :param ring: a BufferRing for scans and bulk operations, or None
 
         """
         
-        buff = self.buffer_manager.pin(block)
+        buff = self.buffer_manager.pin(block, ring)
         self.buffers[block] = buff
         self.pins.append(block)
         
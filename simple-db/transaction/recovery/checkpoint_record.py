@@ -1,11 +1,11 @@
+from .log_format import LogFormat
 from .log_record import LogRecord
-from file.page import Page
 
 class CheckpointRecord(LogRecord):
     def op(self):
         return self.CHECKPOINT
     
-    def tx_number():
+    def tx_number(self):
         """
         Checkpoint record has no associated transaction
         So return -1
@@ -21,14 +21,12 @@ class CheckpointRecord(LogRecord):
     def to_string(self):
         return "<CHECKPOINT>"
     
-    def write_to_log(self, log_manager):
+    @staticmethod
+    def write_to_log(log_manager):
         """
         A static method to write a checkpoint record to the log.
         This log record contains the checkpoint operator, and nothing else.
         
         :return: the LSN of the last log value
         """
-        rec = bytearray(4)
-        page = Page(rec)
-        page.set_int(0, self.CHECKPOINT)
-        return log_manager.append(rec)
\ No newline at end of file
+        return log_manager.append(LogFormat.encode(LogRecord.CHECKPOINT))
\ No newline at end of file
@@ -1,7 +1,9 @@
 
-from log_record import LogRecord
 from file.page import Page
 
+from .log_format import LogFormat
+from .log_record import LogRecord
+
 class CommitRecord(LogRecord):
     def __init__(self, page:Page):
         offset = 4
@@ -22,14 +24,11 @@ class CommitRecord(LogRecord):
     def __str__(self):
         return f'<COMMIT {self.tx_num}>'
     
-    def write_to_log(self, log_manager, tx_num):
+    @staticmethod
+    def write_to_log(log_manager, tx_num):
         """
         Write a commit record to the log.
         This record contains the COMMIT operator, followed by the transaction id.
         :return: the LSN of the last log value
         """
-        rec = bytearray(8)
-        page = Page(rec)
-        page.set_int(0, self.COMMIT)
-        page.set_int(4, tx_num)
-        return log_manager.append(rec)
\ No newline at end of file
+        return log_manager.append(LogFormat.encode(LogRecord.COMMIT, tx_num))
\ No newline at end of file
@@ -0,0 +1,162 @@
+from collections import namedtuple
+
+from file.block_id import BlockId
+from file.page import Page
+
+LogFields = namedtuple('LogFields', ['op', 'tx_num', 'block', 'offset', 'val'])
+
+
+class LogFormat:
+    """
+    The compact, versioned encoding of log records.
+
+    A compact record starts with a version byte, which a record in the original
+    format can never start with: that format begins with the operator as a
+    4-byte big-endian int, whose first byte is 0. The version byte is followed by
+    the operator byte and the transaction number as a varint (except for
+    checkpoints). Update records go on with the file id from the log's
+    FileDictionary, the block number and offset as varints, and the old value:
+    a zigzag varint for SETINT, a varint length and the characters for SETSTRING.
+    """
+    VERSION = 0xC1  # version 1 of the compact format
+
+    CHECKPOINT = 0
+    SETINT = 4
+    SETSTRING = 5
+
+    @classmethod
+    def encode(cls, op, tx_num=None, file_ids=None, block=None, offset=None, val=None):
+        """
+        Encodes a log record.
+
+        :param op: The record's operator
+        :param tx_num: The transaction number; not stored for checkpoints
+        :param file_ids: The FileDictionary of the log, for update records
+        :param block: The updated block, for update records
+        :param offset: The updated offset, for update records
+        :param val: The old value, for update records
+        :return: The encoded record
+        """
+        rec = bytearray((cls.VERSION, op))
+        if op != cls.CHECKPOINT:
+            cls.write_varint(rec, tx_num)
+        if op in (cls.SETINT, cls.SETSTRING):
+            cls.write_varint(rec, file_ids.id_of(block.filename()))
+            cls.write_varint(rec, block.number())
+            cls.write_varint(rec, offset)
+            if op == cls.SETINT:
+                cls.write_varint(rec, (val << 1) ^ (val >> 63))  # zigzag: small magnitudes stay short
+            else:
+                chars = val.encode(Page.CHARSET)
+                cls.write_varint(rec, len(chars))
+                rec += chars
+        return bytes(rec)
+
+    @classmethod
+    def decode(cls, data, file_ids):
+        """
+        Decodes a compact log record.
+
+        :param data: The record's bytes
+        :param file_ids: The FileDictionary of the log
+        :return: LogFields; the fields a record type does not have are None
+        """
+        op = data[1]
+        if op == cls.CHECKPOINT:
+            return LogFields(op, -1, None, None, None)
+        if op not in (cls.SETINT, cls.SETSTRING):
+            tx_num, _ = cls.read_varint(data, 2)
+            return LogFields(op, tx_num, None, None, None)
+
+        (tx_num, file_id, number, offset, n), pos = cls.read_varints(data, 2, 5)
+        block = BlockId.of(file_ids.name_of(file_id), number)
+        if op == cls.SETINT:
+            val = (n >> 1) ^ -(n & 1)
+        else:
+            val = str(data[pos:pos + n], Page.CHARSET)
+        return LogFields(op, tx_num, block, offset, val)
+
+    @classmethod
+    def decode_header(cls, data):
+        """
+        Decodes only the operator and transaction number of a compact log record,
+        which is all that recovery needs of most records.
+
+        :param data: The record's bytes
+        :return: The operator and the transaction number, -1 for a checkpoint
+        """
+        op = data[1]
+        if op == cls.CHECKPOINT:
+            return op, -1
+        if data[2] < 0x80:
+            return op, data[2]
+        return op, cls.read_varint(data, 2)[0]
+
+    @staticmethod
+    def is_compact(data):
+        """
+        :param data: The bytes of a log record
+        :return: True if the record is in the compact format
+        """
+        return len(data) > 0 and data[0] == LogFormat.VERSION
+
+    @staticmethod
+    def write_varint(out, n):
+        """
+        Appends a non-negative int to a bytearray, 7 bits per byte, low bits first.
+
+        :param out: The bytearray
+        :param n: The int
+        """
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    @staticmethod
+    def read_varints(data, pos, count):
+        """
+        Reads `count` consecutive ints written by `write_varint`, in one call,
+        taking the one-byte values most fields have without a loop.
+
+        :param data: The bytes
+        :param pos: The position of the first varint
+        :param count: The number of varints
+        :return: The list of ints and the position after them
+        """
+        values = []
+        for _ in range(count):
+            b = data[pos]
+            pos += 1
+            if b < 0x80:
+                values.append(b)
+                continue
+            n = b & 0x7F
+            shift = 7
+            while True:
+                b = data[pos]
+                pos += 1
+                n |= (b & 0x7F) << shift
+                if b < 0x80:
+                    break
+                shift += 7
+            values.append(n)
+        return values, pos
+
+    @staticmethod
+    def read_varint(data, pos):
+        """
+        Reads an int written by `write_varint`.
+
+        :param data: The bytes
+        :param pos: The position of the varint
+        :return: The int and the position after it
+        """
+        n = shift = 0
+        while True:
+            b = data[pos]
+            pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n, pos
+            shift += 7
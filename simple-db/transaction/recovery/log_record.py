@@ -1,14 +1,8 @@
 from abc import ABC, abstractmethod
 
-from transaction import Transaction
 from file.page import Page
 
-from .checkpoint_record import CheckpointRecord
-from .start_record import StartRecord
-from .commit_record import CommitRecord
-from .rollback_record import RollbackRecord
-from .set_int_record import SetIntRecord
-from .set_string_record import SetStringRecord
+from .log_format import LogFormat
 
 class LogRecord(ABC):
     CHECKPOINT  = 0
@@ -18,6 +12,8 @@ class LogRecord(ABC):
     SETINT = 4
     SETSTRING = 5
     
+    _record_types = None  # operator -> record class, see record_types()
+    
     @abstractmethod
     def op(self) -> int:
         """
@@ -35,7 +31,7 @@ class LogRecord(ABC):
         pass
     
     @abstractmethod
-    def undo(self, transaction:Transaction):
+    def undo(self, transaction):
         """
         Reverses the operation of this log record.
         The only log record types that need to be undone 
@@ -44,25 +40,75 @@ class LogRecord(ABC):
         """
         pass
     
-    def create_log_record(self, bytes:bytearray):
+    @staticmethod
+    def create_log_record(bytes:bytearray, file_ids=None):
         """
-        Interprets the bytes returned by the log iterator
+        Interprets the bytes returned by the log iterator.
+        Records in the compact format (see LogFormat) and in the
+        original fixed-width format are both understood.
         :param bytes: the byte array containing the log values
+        :param file_ids: the log's FileDictionary, needed for compact update records
         """
+        record_types = LogRecord.record_types()
+        if LogFormat.is_compact(bytes):
+            fields = LogFormat.decode(bytes, file_ids)
+            return record_types[fields.op].from_fields(fields)
         page = Page(byte_array=bytes)
-        
-        match page.get_int(offset=0):
-            case self.CHECKPOINT:
-                return CheckpointRecord(page)
-            case self.START:
-                return StartRecord(page)
-            case self.COMMIT:
-                return CommitRecord(page)
-            case self.ROLLBACK:
-                return RollbackRecord(page)
-            case self.SETINT:
-                return SetIntRecord(page)
-            case self.SETSTRING:
-                return SetStringRecord(page)
+        return record_types[page.get_int(0)](page)
+    
+    @staticmethod
+    def header(bytes:bytearray):
+        """
+        Reads only the operator and transaction id of a log record, in either format.
+        That is all recovery and rollback need to decide whether to undo a record,
+        so only the records they undo go through create_log_record.
+        :param bytes: the byte array containing the log values
+        :return: the operator and the transaction id, -1 for a checkpoint
+        """
+        if LogFormat.is_compact(bytes):
+            return LogFormat.decode_header(bytes)
+        op = Page.INT.unpack_from(bytes, 0)[0]
+        if op == LogRecord.CHECKPOINT:
+            return op, -1
+        return op, Page.INT.unpack_from(bytes, 4)[0]
+    
+    @staticmethod
+    def record_types():
+        """
+        Returns the record class of each operator.
+        The subclasses are imported here, since they import this module.
+        """
+        if LogRecord._record_types is None:
+            from .checkpoint_record import CheckpointRecord
+            from .start_record import StartRecord
+            from .commit_record import CommitRecord
+            from .rollback_record import RollbackRecord
+            from .set_int_record import SetIntRecord
+            from .set_string_record import SetStringRecord
+            LogRecord._record_types = {
+                LogRecord.CHECKPOINT: CheckpointRecord,
+                LogRecord.START: StartRecord,
+                LogRecord.COMMIT: CommitRecord,
+                LogRecord.ROLLBACK: RollbackRecord,
+                LogRecord.SETINT: SetIntRecord,
+                LogRecord.SETSTRING: SetStringRecord,
+            }
+        return LogRecord._record_types
+    
+    @classmethod
+    def from_fields(cls, fields):
+        """
+        Creates a record from the fields of a compact log record.
+        :param fields: the LogFields decoded by LogFormat
+        """
+        rec = cls.__new__(cls)
+        rec.tx_num = fields.tx_num
+        if fields.block is not None:
+            rec.block = fields.block
+            rec.filename = fields.block.filename()
+            rec.block_num = fields.block.number()
+            rec.offset = fields.offset
+            rec.val = fields.val
+        return rec
         
         
\ No newline at end of file
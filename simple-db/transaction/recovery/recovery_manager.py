@@ -1,20 +1,19 @@
 from typing import Set, Iterator
 from collections import deque
 
-from start_record import StartRecord
 from buffer.buffer_manager import BufferManager
 from buffer.buffer import Buffer
 from log.log_manager import LogManager
-from commit_record import CommitRecord
-from rollback_record import RollbackRecord
-from checkpoint_record import CheckpointRecord
-from set_int_record import SetIntRecord
-from set_string_record import SetStringRecord
-from log_record import LogRecord
-from transaction.transaction import Transaction
+from .start_record import StartRecord
+from .commit_record import CommitRecord
+from .rollback_record import RollbackRecord
+from .checkpoint_record import CheckpointRecord
+from .set_int_record import SetIntRecord
+from .set_string_record import SetStringRecord
+from .log_record import LogRecord
 
 class RecoveryManager:
-    def __init__(self, transaction:Transaction, tx_number, log_manager:LogManager, buffer_manager:BufferManager):
+    def __init__(self, transaction, tx_number, log_manager:LogManager, buffer_manager:BufferManager):
         """
         Create a recovery manager for the specified transaction.
         
@@ -49,11 +48,13 @@ class RecoveryManager:
         """
         Recover uncompleted transactions from the log
         and then write a quiescent checkpoint record to the log and flush it.
+        Log segments before the checkpoint are no longer needed and are deleted.
         """
         self.do_recover()
         self.buffer_manager.flush_all(self.tx_number)
-        lsn = CheckpointRecord.write_to_log(self.log_manager, self.tx_number)
-        self.log_manager.flush(lsn)     
+        lsn = CheckpointRecord.write_to_log(self.log_manager)
+        self.log_manager.flush(lsn)
+        self.log_manager.truncate(lsn)     
         
     def set_int(self, buffer:Buffer, offset:int, new_val:int):
         """
@@ -96,11 +97,12 @@ class RecoveryManager:
         iter: Iterator = self.log_manager.iterator()
         
         for bytes_record in iter:
-            rec = LogRecord.create_log_record(bytes_record)
+            op, tx_number = LogRecord.header(bytes_record)
             
-            if rec.tx_number() == self.tx_number:
-                if rec.op() == LogRecord.START:
+            if tx_number == self.tx_number:
+                if op == LogRecord.START:
                     return
+                rec = LogRecord.create_log_record(bytes_record, self.log_manager.file_ids)
                 rec.undo(self.transaction)
         
         
@@ -118,14 +120,15 @@ class RecoveryManager:
         iter: Iterator = self.log_manager.iterator()
         
         for bytes_record in iter:
-            rec = LogRecord.create_log_record(bytes_record)
+            op, tx_number = LogRecord.header(bytes_record)  # records of finished transactions are not decoded
             
-            if rec.op() == LogRecord.CHECKPOINT:
+            if op == LogRecord.CHECKPOINT:
                 return  # stop recovery when we encounter a checkpoint record
             
-            if rec.op() in {LogRecord.COMMIT, LogRecord.ROLLBACK}:
-                finished_txs.add(rec.tx_number())  # record that this transaction is finished
-            elif rec.tx_number() not in finished_txs:
+            if op in {LogRecord.COMMIT, LogRecord.ROLLBACK}:
+                finished_txs.add(tx_number)  # record that this transaction is finished
+            elif tx_number not in finished_txs:
+                rec = LogRecord.create_log_record(bytes_record, self.log_manager.file_ids)
                 rec.undo(self.transaction)  # undo the operation if the transaction wasn't committed/rolled back
                 
     
\ No newline at end of file
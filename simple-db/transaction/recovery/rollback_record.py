@@ -1,7 +1,9 @@
 
-from log_record import LogRecord
 from file.page import Page
 
+from .log_format import LogFormat
+from .log_record import LogRecord
+
 class RollbackRecord(LogRecord):
     def __init__(self, page:Page):
         offset = 4
@@ -23,14 +25,11 @@ class RollbackRecord(LogRecord):
         return f'<ROLLBACK {self.tx_num}>'
     
     
-    def write_to_log(self, log_manager, tx_num):
+    @staticmethod
+    def write_to_log(log_manager, tx_num):
         """
         Write a rollback record to the log.
         This record contains the ROLLBACK operator, followed by the transaction id.
         :return: the LSN of the last log value
         """
-        rec = bytearray(8)
-        page = Page(rec)
-        page.set_int(0, self.ROLLBACK)
-        page.set_int(4, tx_num)
-        return log_manager.append(rec)
+        return log_manager.append(LogFormat.encode(LogRecord.ROLLBACK, tx_num))
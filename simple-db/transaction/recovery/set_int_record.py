@@ -1,10 +1,10 @@
 
-from log_record import LogRecord
-from transaction.transaction import Transaction
-
 from file.page import Page
 from file.block_id import BlockId
 
+from .log_format import LogFormat
+from .log_record import LogRecord
+
 class SetIntRecord(LogRecord):
     def __init__(self, page:Page):
         """
@@ -37,7 +37,7 @@ class SetIntRecord(LogRecord):
     def __str__(self):
         return f'<SETINT {self.tx_num} {self.block} {self.offset} {self.val}>'
     
-    def undo(self, transaction:Transaction):
+    def undo(self, transaction):
         """
         Replace the specified data value with the value saved in this log record.
         Pins a buffer to the specified block, calls setInt to restore the saved value
@@ -48,25 +48,13 @@ class SetIntRecord(LogRecord):
         transaction.unpin(self.block)
     
     
-    def write_to_log(self, log_manager, tx_num, offset, val, oldval):
+    @staticmethod
+    def write_to_log(log_manager, tx_num, block:BlockId, offset, val):
         """
-        Write a setint record to the log.
-        This record contains the SETINT operator, followed by the transaction id, offset, value and old value.
+        Write a setint record to the log, in the compact format (see LogFormat).
+        This record contains the SETINT operator, followed by the transaction id,
+        the file id and number of the block, the offset and the old value.
         :return: the LSN of the last log value
         """
-        tpos = 4
-        fpos = tpos + 4
-        bpos = fpos + Page.max_length(len(self.filename))
-        opos = bpos + 4
-        vpos = opos + 4
-        
-        rec = bytearray(vpos + 4)
-        page = Page(rec)
-        page.set_int(0, self.SETINT)
-        page.set_int(tpos, tx_num)
-        page.set_string(fpos, self.block.filename())
-        page.set_int(bpos, self.block.number())
-        page.set_int(opos, self.offset)
-        page.set_int(vpos, self.val)
-
-        return log_manager.append(rec)
\ No newline at end of file
+        return log_manager.append(
+            LogFormat.encode(LogRecord.SETINT, tx_num, log_manager.file_ids, block, offset, val))
\ No newline at end of file
@@ -1,9 +1,9 @@
-from transaction.transaction import Transaction
-from log_record import LogRecord
-
 from file.page import Page
 from file.block_id import BlockId
 
+from .log_format import LogFormat
+from .log_record import LogRecord
+
 class SetStringRecord(LogRecord):
     def __init__(self, page:Page):
         """
@@ -36,7 +36,7 @@ class SetStringRecord(LogRecord):
     def __str__(self):
         return f'<SETSTRING {self.tx_num} {self.block} {self.offset} {self.val}>'
     
-    def undo(self, transaction:Transaction):
+    def undo(self, transaction):
         """
         Replace the specified data value with the value saved in this log record.
         Pins a buffer to the specified block, calls set_string to restore the saved value
@@ -46,27 +46,13 @@ class SetStringRecord(LogRecord):
         transaction.set_string(self.block, self.offset, self.val, False)  # don't log the undo
         transaction.unpin(self.block)
         
-    def write_to_log(self, log_manager, tx_num, block:BlockId, offset, val):
+    @staticmethod
+    def write_to_log(log_manager, tx_num, block:BlockId, offset, val):
         """
-        Write a setstring record to the log.
-        This record contains the SETSTRING operator, followed by the transaction id, offset, value and old value.
+        Write a setstring record to the log, in the compact format (see LogFormat).
+        This record contains the SETSTRING operator, followed by the transaction id,
+        the file id and number of the block, the offset and the old value.
         :return: the LSN of the last log value
         """
-        tpos = 4
-        fpos = tpos + 4
-        bpos = fpos + Page.max_length(len(self.filename))
-        opos = bpos + 4
-        vpos = opos + 4
-        
-        rec_len = vpos + Page.max_length(len(val))
-        rec = bytearray(rec_len)
-        
-        page = Page(rec)
-        page.set_int(0, self.SETSTRING)
-        page.set_int(tpos, tx_num)
-        page.set_string(fpos, self.filename)
-        page.set_int(bpos, block.number())
-        page.set_int(opos, offset)
-        page.set_string(vpos, val)
-        
-        return log_manager.append(rec)
\ No newline at end of file
+        return log_manager.append(
+            LogFormat.encode(LogRecord.SETSTRING, tx_num, log_manager.file_ids, block, offset, val))
\ No newline at end of file
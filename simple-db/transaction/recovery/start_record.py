@@ -1,5 +1,6 @@
 from file.page import Page
 
+from .log_format import LogFormat
 from .log_record import LogRecord
 
 class StartRecord(LogRecord):
@@ -28,14 +29,11 @@ class StartRecord(LogRecord):
     def __str__(self):
         return f'<Start {self.tx_num}>'
     
-    def write_to_log(self, log_manager, tx_num):
+    @staticmethod
+    def write_to_log(log_manager, tx_num):
         """
         Write a start record to the log.
         This record contains the START operator, followed by the transaction id.
         :return: the LSN of the last log value
         """
-        rec = bytearray(8)
-        page = Page(rec)
-        page.set_int(0, self.START)
-        page.set_int(4, tx_num)
-        return log_manager.append(rec)
\ No newline at end of file
+        return log_manager.append(LogFormat.encode(LogRecord.START, tx_num))
\ No newline at end of file
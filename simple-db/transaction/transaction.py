@@ -63,14 +63,18 @@ class Transaction:
         self.buffer_manager.flush_all(self.tx_num)
         self.recovery_manager.recover() 
         
-    def pin(self, block):
+    def pin(self, block, ring=None):
         """
         Pins the specified block.
         The transaction manages the buffer internally.
+        A large sequential scan or bulk load should pass a BufferRing
+        (see buffer/buffer_ring.py) for all its blocks, so that it reuses
+        a few buffers instead of evicting the pool's hot pages.
         
         :param block: a reference to the disk block
+        :param ring: a BufferRing confining the operation to a few buffers, or None
         """
-        self.my_buffers.pin(block)
+        self.my_buffers.pin(block, ring)
         
     def unpin(self, block):
         """
@@ -167,7 +171,7 @@ class Transaction:
         :param filename: the name of the file
         :return: a reference to the newly-created disk block
         """
-        dummy_block = BlockId(filename(), -1)
+        dummy_block = BlockId.of(filename, -1)
         self.concurrency_mgr.x_lock(dummy_block)
         return self.file_manager.length(filename)
     
@@ -182,7 +186,7 @@ class Transaction:
         :param filename: the name of the file
         :return: a reference to the newly-created disk block
         """
-        dummy_block = BlockId(filename(), -1)
+        dummy_block = BlockId.of(filename, -1)
         self.concurrency_mgr.x_lock(dummy_block)
         return self.file_manager.append(filename)
     